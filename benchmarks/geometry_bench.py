@@ -0,0 +1,104 @@
+"""Benchmark da preparação de geometrias (src/geometry.py): tamanho do payload e erro de área.
+
+Simplifica as geometrias do shapefile e um conjunto sintético de talhões com bordas muito detalhadas
+(vértices a cada ~1 m, com ruído, buracos e multipolígonos) e compara com as originais: número de
+vértices, bytes do JSON enviado ao Earth Engine e erro relativo de área. Falha (código de saída 1)
+se alguma geometria passar do limite perímetro * tolerância documentado em src/geometry.py.
+
+Uso (a partir da raiz do repositório):
+    python benchmarks/geometry_bench.py [--shapefile data/raw/batista.shp] [--parcels 500] [--scale 10]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.geometry import METERS_PER_DEGREE, encode_geometry, prepare_geometry, simplify_tolerance
+
+
+def synthetic_parcels(n_parcels, seed=0):
+    """Talhões irregulares com ~1 vértice por metro de borda; um em cada cinco tem um buraco e um em
+    cada dez tem duas partes"""
+    from shapely.geometry import MultiPolygon, Polygon
+
+    rng = np.random.default_rng(seed)
+    geometries = []
+    for i in range(n_parcels):
+        center = np.array([-46.0 + (i % 50) * 0.02, -20.0 + (i // 50) * 0.02])
+        radius = rng.uniform(50, 500) / METERS_PER_DEGREE
+        n_vertices = max(int(2 * np.pi * radius * METERS_PER_DEGREE), 32)
+        angles = np.linspace(0, 2 * np.pi, n_vertices, endpoint=False)
+        wobble = 1 + 0.15 * np.sin(3 * angles + rng.uniform(0, 6)) + rng.normal(0, 0.002, n_vertices)
+        shell = center + np.c_[np.cos(angles), np.sin(angles)] * (radius * wobble)[:, None]
+
+        holes = []
+        if i % 5 == 0:
+            hole_angles = np.linspace(0, 2 * np.pi, max(n_vertices // 4, 16), endpoint=False)
+            holes.append(center + np.c_[np.cos(hole_angles), np.sin(hole_angles)] * radius * 0.3)
+
+        polygon = Polygon(shell, holes)
+        if i % 10 == 0:
+            polygon = MultiPolygon([polygon, Polygon(shell + [radius * 3, 0])])
+        geometries.append(polygon)
+    return geometries
+
+
+def payload_size(geom):
+    geometry_type, coordinates = encode_geometry(geom)
+    return len(json.dumps({'type': geometry_type, 'coordinates': coordinates}))
+
+
+def vertex_count(geom):
+    import shapely
+
+    return int(shapely.get_num_coordinates(geom))
+
+
+def evaluate(label, geometries, scale):
+    tolerance = simplify_tolerance(scale)
+    start = time.perf_counter()
+    prepared = [prepare_geometry(geom, scale) for geom in geometries]
+    elapsed = time.perf_counter() - start
+
+    errors = np.array([abs(p.area - g.area) / g.area for g, p in zip(geometries, prepared)])
+    bounds = np.array([g.length * tolerance / g.area for g in geometries])
+    vertices = sum(map(vertex_count, geometries)), sum(map(vertex_count, prepared))
+    sizes = sum(map(payload_size, geometries)), sum(map(payload_size, prepared))
+    invalid = sum(not p.is_valid for p in prepared)
+
+    print(f'{label}: {len(geometries)} geometrias, simplificação em {elapsed:.3f} s')
+    print(f'  vértices {vertices[0]} -> {vertices[1]} ({vertices[1] / vertices[0]:.1%})')
+    print(f'  payload  {sizes[0]} -> {sizes[1]} bytes ({sizes[1] / sizes[0]:.1%})')
+    print(f'  erro de área: máximo {errors.max():.4%}, médio {errors.mean():.4%}; '
+          f'limite perímetro * tolerância: mínimo {bounds.min():.2%}')
+    print(f'  geometrias inválidas após a simplificação: {invalid}')
+
+    return bool((errors <= bounds).all() and invalid == 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--shapefile', default='data/raw/batista.shp')
+    parser.add_argument('--parcels', type=int, default=500)
+    parser.add_argument('--scale', type=float, default=10)
+    args = parser.parse_args()
+
+    ok = True
+    if os.path.exists(args.shapefile):
+        import geopandas as gpd
+
+        ok &= evaluate(args.shapefile, list(gpd.read_file(args.shapefile).geometry), args.scale)
+    ok &= evaluate('sintético', synthetic_parcels(args.parcels), args.scale)
+
+    if not ok:
+        print('ERRO: erro de área acima do limite ou geometria inválida')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
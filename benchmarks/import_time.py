@@ -0,0 +1,64 @@
+"""Benchmark do tempo de importação dos módulos do pacote src.
+
+Cada módulo é importado em um processo Python novo, para medir o custo real de partida do main.py
+e do app Streamlit. O script também verifica que nenhuma dependência pesada (Earth Engine,
+geopandas, geemap, plotly, matplotlib) é carregada só pela importação, e termina com código 1
+se isso acontecer ou se o tempo passar do limite.
+
+Uso (a partir da raiz do repositório):
+    python benchmarks/import_time.py [--repeat 5] [--budget 1.5]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+MODULES = ['src.data_processing', 'src.data_visualization']
+HEAVY_MODULES = ['ee', 'geopandas', 'geemap', 'plotly', 'matplotlib']
+
+PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'elapsed': elapsed, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+'''
+
+
+def measure(module, repeat):
+    """Melhor tempo de importação (em segundos) e dependências pesadas carregadas"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    timings = []
+    loaded = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=root, capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        timings.append(result['elapsed'])
+        loaded = result['loaded']
+    return min(timings), loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=1.5, help='tempo máximo de importação em segundos')
+    args = parser.parse_args()
+
+    failed = False
+    for module in MODULES:
+        elapsed, loaded = measure(module, args.repeat)
+        status = 'ok'
+        if loaded or elapsed > args.budget:
+            status = 'FALHOU'
+            failed = True
+        print(f'{module:<28} {elapsed * 1000:8.1f} ms  pesados carregados: {loaded or "-"}  [{status}]')
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Confere o NumpyBackend contra as estatísticas exatas do NumPy em um raster sintético.
+
+O NDVI do raster inteiro é calculado de uma vez e mascarado pelos centros dos pixels dentro da
+geometria (um polígono com buraco); média, desvio padrão, mínimo e máximo do backend, lidos em blocos
+de poucas linhas de um memory-map, devem bater com np.mean/np.std/np.min/np.max a menos de
+arredondamento, e a mediana ficar a no máximo uma largura de bin (0.001) do np.median. Também roda o
+get_all_data de ponta a ponta com o backend local, sem cliente do Earth Engine, a partir de um shapefile
+em WGS84 (como o data/raw/batista.shp) sobre a cena em UTM: a média deve ficar a no máximo 0.001 da
+calculada com a geometria em UTM (a ida e volta da reprojeção pode mudar de lado pixels com o centro
+exatamente sobre uma aresta), o módulo ee não pode ser importado e uma cena sem crs (geometria fora do raster) deve
+gerar erro em vez de uma linha vazia.
+
+Uso (a partir da raiz do repositório):
+    python benchmarks/numpy_backend_check.py [--size 1500] [--chunk-rows 97]
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.backends import LocalScene, NumpyBackend
+from src.data_processing import DataProcessor
+
+MEDIAN_TOLERANCE = 0.001
+RELATIVE_TOLERANCE = 1e-9
+UTM_CRS = 'EPSG:32723'
+REPROJECTION_TOLERANCE = 0.001
+
+
+def synthetic_scene(workdir, size, seed=0):
+    """Cena com bandas B4/B8 em .npy (abertas como memory-map) sobre um grid de 10 m em UTM"""
+    rng = np.random.default_rng(seed)
+    b4 = rng.integers(0, 4000, (size, size), dtype=np.uint16)
+    b8 = rng.integers(0, 6000, (size, size), dtype=np.uint16)
+    # Alguns pixels com soma zero (NDVI indefinido), ignorados nos dois cálculos
+    b4[:3, :3] = 0
+    b8[:3, :3] = 0
+
+    b4_path, b8_path = os.path.join(workdir, 'b4.npy'), os.path.join(workdir, 'b8.npy')
+    np.save(b4_path, b4)
+    np.save(b8_path, b8)
+    transform = (500000.0, 10.0, 7500000.0, -10.0)
+    return LocalScene.from_npy('S2_SYNTH', '2023-01-05', b4_path, b8_path, transform, crs=UTM_CRS), b4, b8
+
+
+def synthetic_geometry(size):
+    """Polígono com buraco cobrindo boa parte do raster, incluindo o canto com NDVI indefinido"""
+    from shapely.geometry import Point, Polygon
+
+    x0, y0 = 500000.0, 7500000.0
+    extent = size * 10.0
+    outer = Polygon([(x0 - 50, y0 + 50), (x0 + extent * 0.9, y0 - extent * 0.1),
+                     (x0 + extent * 0.7, y0 - extent * 0.95), (x0 + extent * 0.05, y0 - extent * 0.6)])
+    hole = Point(x0 + extent * 0.45, y0 - extent * 0.45).buffer(extent * 0.1)
+    return outer.difference(hole)
+
+
+def exact_stats(b4, b8, geom, transform):
+    import shapely
+
+    x0, dx, y0, dy = transform
+    xs = x0 + (np.arange(b4.shape[1]) + 0.5) * dx
+    ys = y0 + (np.arange(b4.shape[0]) + 0.5) * dy
+    mask = shapely.contains_xy(geom, *np.meshgrid(xs, ys))
+
+    red, nir = b4.astype(np.float64), b8.astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ndvi = (nir - red) / (nir + red)
+    values = ndvi[mask]
+    values = values[np.isfinite(values)]
+    return {
+        'NDVI_mean': np.mean(values),
+        'NDVI_stdDev': np.std(values),
+        'NDVI_min': np.min(values),
+        'NDVI_max': np.max(values),
+        'NDVI_median': np.median(values),
+    }, values.size
+
+
+def check_offline_pipeline(workdir, scene, geom, expected_mean):
+    """get_all_data com o NumpyBackend, sem cliente do Earth Engine, a partir de um shapefile em WGS84"""
+    import geopandas as gpd
+
+    shapefile = os.path.join(workdir, 'synthetic.shp')
+    gpd.GeoDataFrame({'cod_imovel': ['SYNTH']}, geometry=[geom], crs=UTM_CRS).to_crs('EPSG:4326').to_file(shapefile)
+
+    os.chdir(workdir)
+    os.makedirs('data/processed', exist_ok=True)
+    processor = DataProcessor(shapefile, '2023-01-01', backend=NumpyBackend([scene]), cache_dir='data/cache')
+    df, _ = processor.get_all_data(use_cache=False)
+
+    error = abs(df['ndvi_mean'].iloc[0] - expected_mean) if len(df) == 1 else np.inf
+    ok = error <= REPROJECTION_TOLERANCE and 'ee' not in sys.modules
+    print(f'get_all_data offline (shapefile em WGS84, cena em UTM): {len(df)} cena(s), erro da média '
+          f'{error:.1e}, módulo ee importado: {"ee" in sys.modules}')
+
+    # Sem crs na cena, a geometria em graus fica fora do raster em metros
+    scene_without_crs = LocalScene(scene.scene_id, scene.date, scene.b4, scene.b8, scene.transform)
+    processor = DataProcessor(shapefile, '2023-01-01', backend=NumpyBackend([scene_without_crs]),
+                              cache_dir='data/cache')
+    try:
+        processor.get_all_data(use_cache=False)
+    except ValueError as e:
+        print(f'cena sem crs: erro esperado ({e})')
+    else:
+        print('cena sem crs: FALHOU, nenhum erro')
+        ok = False
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=1500, help='lado do raster em pixels')
+    parser.add_argument('--chunk-rows', type=int, default=97)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='agro_numpy_check_')
+    scene, b4, b8 = synthetic_scene(workdir, args.size)
+    geom = synthetic_geometry(args.size)
+
+    result = NumpyBackend([scene], chunk_rows=args.chunk_rows).reduce_scene(scene, geom)
+    expected, n_pixels = exact_stats(b4, b8, geom, scene.transform)
+    print(f'{n_pixels} pixels válidos dentro da geometria, blocos de {args.chunk_rows} linhas')
+
+    ok = True
+    for name, value in expected.items():
+        error = abs(result[name] - value)
+        tolerance = MEDIAN_TOLERANCE if name == 'NDVI_median' else RELATIVE_TOLERANCE * max(abs(value), 1)
+        passed = error <= tolerance
+        ok &= passed
+        print(f'  {name:<12} backend {result[name]: .9f}  numpy {value: .9f}  erro {error:.2e}  '
+              f'{"ok" if passed else "FALHOU"} (limite {tolerance:.0e})')
+
+    ok &= check_offline_pipeline(workdir, scene, geom, result['NDVI_mean'])
+
+    if not ok:
+        print('ERRO: NumpyBackend diverge das estatísticas exatas')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
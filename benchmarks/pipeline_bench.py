@@ -0,0 +1,172 @@
+"""Benchmark offline do pipeline do DataProcessor com o Earth Engine falso (src/fake_ee.py).
+
+Roda as etapas que acessam o Earth Engine contra cenas sintéticas, com uma latência simulada por ida
+ao servidor, e mede para cada etapa o tempo total, o número de idas ao servidor (getInfo/getThumbURL)
+e os bytes recebidos (respostas do getInfo e PNGs baixados de um servidor HTTP local). As etapas de
+uma parcela rodam uma vez; get_all_parcels_data roda para cada quantidade de parcelas.
+
+As idas ao servidor são determinísticas, então cada etapa tem um orçamento (ROUND_TRIP_BUDGETS) em
+função do número de parcelas e de cenas; o script termina com código 1 se alguma etapa passar dele,
+o que acusa regressões como voltar a fazer uma chamada por cena ou por parcela.
+
+Uso (a partir da raiz do repositório):
+    python benchmarks/pipeline_bench.py [--parcels 1,100,10000] [--latency 0.05] [--scenes 73] [--rate 20]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.data_processing import DataProcessor
+from src.fake_ee import FakeEarthEngine
+from src.scheduler import RemoteScheduler
+
+GETINFO_MAX_FEATURES = 5000
+
+# Etapa -> máximo de idas ao servidor, em função de (parcelas, cenas); None = sem orçamento (modo antigo)
+ROUND_TRIP_BUDGETS = {
+    'get_all_data (por imagem)': None,
+    'get_all_data (em lote)': lambda parcels, scenes: 1,
+    'get_all_data (cache frio)': lambda parcels, scenes: 1,
+    'get_all_data (cache quente)': lambda parcels, scenes: 0,
+    # Uma chamada com as estatísticas de todos os meses e uma getThumbURL por mês
+    'get_composites_batch': lambda parcels, scenes: 1 + 12,
+    'get_montly_images': lambda parcels, scenes: 12,
+    'get_all_parcels_data (parcela)': lambda parcels, scenes: parcels,
+    # Um getInfo com os footprints unidos por tile e um por lote de até 5000 linhas (parcelas x cenas)
+    'get_all_parcels_data (tile)':
+        lambda parcels, scenes: 1 + -(-parcels // max(1, GETINFO_MAX_FEATURES // scenes)),
+}
+
+
+def synthetic_parcels(path, n_parcels, size=0.002, seed=0):
+    """Grava um shapefile com n_parcels quadrados de ~200 m lado a lado, com a coluna cod_imovel"""
+    import geopandas as gpd
+    from shapely.geometry import box
+
+    rng = np.random.default_rng(seed)
+    columns = int(np.ceil(np.sqrt(n_parcels)))
+    geometries = []
+    for i in range(n_parcels):
+        x = -47.0 + (i % columns) * size * 1.5
+        y = -22.0 + (i // columns) * size * 1.5
+        geometries.append(box(x, y, x + size * rng.uniform(0.5, 1), y + size * rng.uniform(0.5, 1)))
+
+    gdf = gpd.GeoDataFrame({'cod_imovel': [f'P{i:05d}' for i in range(n_parcels)]}, geometry=geometries,
+                           crs='EPSG:4326')
+    gdf.to_file(path)
+    return path
+
+
+def start_thumb_server(png_bytes):
+    """Servidor HTTP local que responde qualquer thumbnail com o mesmo PNG e conta os bytes enviados"""
+    served = {'bytes': 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/png')
+            self.send_header('Content-Length', str(len(png_bytes)))
+            self.end_headers()
+            self.wfile.write(png_bytes)
+            with lock:
+                served['bytes'] += len(png_bytes)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, served
+
+
+def synthetic_png(size=256):
+    from io import BytesIO
+
+    from PIL import Image
+
+    rng = np.random.default_rng(0)
+    buffer = BytesIO()
+    Image.fromarray(rng.integers(0, 255, (size, size, 3), dtype=np.uint8)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def measure(stage, n_parcels, fake, function, served=None):
+    """Roda e mede uma etapa; retorna False se as idas ao servidor passarem do orçamento"""
+    fake.reset_counters()
+    http_before = served['bytes'] if served else 0
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    http_bytes = (served['bytes'] - http_before) if served else 0
+    budget = ROUND_TRIP_BUDGETS[stage]
+    limit = budget(n_parcels, len(fake.scenes)) if budget else None
+    within = limit is None or fake.round_trips <= limit
+    print(f'{stage:<32} {n_parcels:>7} {elapsed:9.3f} s {fake.round_trips:>8} {"" if limit is None else limit:>9} '
+          f'{fake.bytes_transferred:>12} {http_bytes:>12}{"" if within else "  ACIMA DO ORÇAMENTO"}')
+    return within
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--parcels', default='1,100,10000', help='quantidades de parcelas separadas por vírgula')
+    parser.add_argument('--latency', type=float, default=0.05, help='segundos por ida ao servidor')
+    parser.add_argument('--scenes', type=int, default=73)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=None,
+                        help='limite de requisições por segundo do agendador (padrão: sem limite)')
+    args = parser.parse_args()
+
+    counts = [int(n) for n in args.parcels.split(',')]
+    workdir = tempfile.mkdtemp(prefix='agro_bench_')
+    os.chdir(workdir)
+    for folder in ('data/processed', 'data/results', 'data/raw'):
+        os.makedirs(folder, exist_ok=True)
+
+    server, served = start_thumb_server(synthetic_png())
+    fake = FakeEarthEngine(n_scenes=args.scenes, latency=args.latency,
+                           thumb_base_url=f'http://127.0.0.1:{server.server_address[1]}')
+
+    scheduler = RemoteScheduler(rate=args.rate, max_concurrency=max(args.workers, 8))
+
+    print(f'latência simulada {args.latency * 1000:.0f} ms, {args.scenes} cenas, diretório {workdir}')
+    print(f'{"etapa":<32} {"parcelas":>7} {"tempo":>11} {"idas":>8} {"orçamento":>9} {"bytes ee":>12} '
+          f'{"bytes http":>12}')
+    ok = True
+
+    shapefile = synthetic_parcels('data/raw/parcels_1.shp', 1)
+    processor = DataProcessor(shapefile, '2023-01-01', ee_client=fake, cache_dir='data/cache',
+                              scheduler=scheduler)
+    ok &= measure('get_all_data (por imagem)', 1, fake, lambda: processor.get_all_data(batched=False))
+    ok &= measure('get_all_data (em lote)', 1, fake, lambda: processor.get_all_data(use_cache=False))
+    ok &= measure('get_all_data (cache frio)', 1, fake, lambda: processor.get_all_data())
+    ok &= measure('get_all_data (cache quente)', 1, fake, lambda: processor.get_all_data())
+    ok &= measure('get_composites_batch', 1, fake, lambda: processor.get_composites_batch(), served)
+    ok &= measure('get_montly_images', 1, fake, lambda: processor.get_montly_images(overwrite=True), served)
+
+    for n_parcels in counts:
+        shapefile = synthetic_parcels(f'data/raw/parcels_{n_parcels}.shp', n_parcels)
+        processor = DataProcessor(shapefile, '2023-01-01', ee_client=fake, cache_dir='data/cache',
+                              scheduler=scheduler)
+        ok &= measure('get_all_parcels_data (parcela)', n_parcels, fake,
+                lambda: processor.get_all_parcels_data(max_workers=args.workers, by_tile=False))
+        ok &= measure('get_all_parcels_data (tile)', n_parcels, fake,
+                lambda: processor.get_all_parcels_data(max_workers=args.workers))
+
+    server.shutdown()
+
+    if not ok:
+        print('ERRO: idas ao servidor acima do orçamento')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Regressão de tamanho: relatório com plotly.js compartilhado x um HTML autocontido por gráfico.
+
+Gera, a partir de data/processed/ndvi.csv, as saídas antigas (fig.write_html de cada gráfico) e o
+relatório novo (write_report) para N parcelas em um diretório temporário, e compara o total em
+disco. Termina com código 1 se o relatório não for pelo menos --min-ratio vezes menor.
+
+Uso (a partir da raiz do repositório):
+    python benchmarks/report_size.py [--parcels 10] [--min-ratio 3]
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.data_visualization import NDVIVisualization
+from src.report import write_report
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--parcels', type=int, default=10)
+    parser.add_argument('--min-ratio', type=float, default=3.0)
+    args = parser.parse_args()
+
+    df = pd.read_csv('data/processed/ndvi.csv')
+    figures = {f'parcela_{i}': NDVIVisualization(df, '2023-01-01', None).build_figures() for i in range(args.parcels)}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        old_dir = os.path.join(tmp, 'standalone')
+        new_dir = os.path.join(tmp, 'report')
+        os.makedirs(old_dir)
+
+        for parcel_id, parcel_figures in figures.items():
+            for name, fig in parcel_figures.items():
+                fig.write_html(os.path.join(old_dir, f'{parcel_id}_{name}.html'))
+
+        write_report(figures, new_dir)
+
+        old_size = directory_size(old_dir)
+        new_size = directory_size(new_dir)
+
+    ratio = old_size / new_size
+    print(f'HTML autocontido: {old_size / 1e6:8.2f} MB')
+    print(f'Relatório:        {new_size / 1e6:8.2f} MB')
+    print(f'Redução:          {ratio:8.1f}x (mínimo {args.min_ratio}x)')
+
+    sys.exit(0 if ratio >= args.min_ratio else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Confere o StreamingStats contra as estatísticas exatas do NumPy.
+
+Para cada distribuição sintética de NDVI, os valores são consumidos em blocos de tamanhos variados por
+um único reducer e também divididos entre vários reducers parciais unidos com merge (como em workers
+paralelos). Nos dois casos média, desvio padrão, mínimo e máximo devem bater com np.mean/np.std/
+np.min/np.max a menos de arredondamento de ponto flutuante, e a mediana ficar a no máximo uma largura
+de bin, (max - min) / bins, do np.median. Sai com código 1 se algum limite for violado.
+
+Uso (a partir da raiz do repositório):
+    python benchmarks/streaming_check.py [--size 2000000] [--bins 2000]
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.streaming import StreamingStats
+
+RELATIVE_TOLERANCE = 1e-9
+
+
+def distributions(size, rng):
+    """Distribuições de NDVI: uniforme, bimodal (solo e vegetação), concentrada e com NaN"""
+    bimodal = np.concatenate([rng.normal(0.15, 0.05, size // 2), rng.normal(0.8, 0.05, size - size // 2)])
+    with_nan = rng.uniform(-1, 1, size)
+    with_nan[rng.random(size) < 0.1] = np.nan
+    return {
+        'uniforme': rng.uniform(-1, 1, size),
+        'bimodal': np.clip(bimodal, -1, 1),
+        'concentrada': np.clip(rng.normal(0.62, 0.002, size), -1, 1),
+        'com NaN': with_nan,
+    }
+
+
+def split(values, rng, n_blocks):
+    """Divide os valores em blocos de tamanhos aleatórios"""
+    cuts = np.sort(rng.choice(np.arange(1, values.size), n_blocks - 1, replace=False))
+    return np.split(values, cuts)
+
+
+def check(label, stats, values, bins):
+    values = values[np.isfinite(values)]
+    expected = {
+        'mean': (stats.mean, np.mean(values)),
+        'std': (stats.std(), np.std(values)),
+        'min': (stats.min, np.min(values)),
+        'max': (stats.max, np.max(values)),
+    }
+    low, high = stats.value_range
+    width = (high - low) / bins
+
+    ok = stats.count == values.size
+    errors = []
+    for name, (value, exact) in expected.items():
+        error = abs(value - exact)
+        ok &= error <= RELATIVE_TOLERANCE * max(abs(exact), 1)
+        errors.append(f'{name} {error:.1e}')
+
+    median_error = abs(stats.median() - np.median(values))
+    ok &= median_error <= width
+    errors.append(f'mediana {median_error:.1e} (limite {width:.0e})')
+
+    print(f'  {label:<28} {"ok" if ok else "FALHOU"}: {", ".join(errors)}')
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=2_000_000)
+    parser.add_argument('--bins', type=int, default=2000)
+    parser.add_argument('--blocks', type=int, default=37)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    ok = True
+    for name, values in distributions(args.size, rng).items():
+        print(name)
+        blocks = split(values, rng, args.blocks)
+
+        sequential = StreamingStats(bins=args.bins)
+        for block in blocks:
+            sequential.update(block)
+        ok &= check('blocos sequenciais', sequential, values, args.bins)
+
+        # Reducers parciais por grupo de blocos, unidos em ordem embaralhada
+        partials = [StreamingStats(bins=args.bins) for _ in range(5)]
+        for i, block in enumerate(blocks):
+            partials[i % len(partials)].update(block)
+        merged = StreamingStats(bins=args.bins)
+        for i in rng.permutation(len(partials)):
+            merged.merge(partials[i])
+        ok &= check('merge de parciais', merged, values, args.bins)
+
+    if not ok:
+        print('ERRO: StreamingStats fora dos limites de erro documentados')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Benchmark das análises de séries temporais (preenchimento, Savitzky-Golay e fenologia).
+
+Gera um DataFrame sintético no formato longo do get_all_parcels_data (parcel_id, date, ndvi_mean) com
+uma curva sazonal por parcela, ruído e cenas faltando (nuvens), e mede cada etapa sobre a matriz
+parcelas x datas. Em uma fração das parcelas o NDVI cai de forma brusca logo depois do pico (colheita);
+o script termina com código 1 se menos de 95% dessas colheitas forem detectadas ou se mais de 1% das
+demais parcelas forem marcadas como colhidas.
+
+Uso (a partir da raiz do repositório):
+    python benchmarks/timeseries_bench.py [--parcels 20000] [--scenes 73] [--harvested 0.1]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.timeseries import build_matrix, fill_gaps, phenology_metrics, savgol_smooth
+
+MIN_DETECTION_RATE = 0.95
+MAX_FALSE_POSITIVE_RATE = 0.01
+
+
+def synthetic_data(n_parcels, n_scenes, missing=0.3, harvested=0.1, seed=0):
+    """Curvas de NDVI sazonais com pico em datas diferentes por parcela e ~30% das cenas faltando.
+
+    Nas parcelas colhidas o NDVI cai para o nível do solo (~0.2) duas datas depois do pico. Retorna o
+    DataFrame e os IDs das parcelas colhidas.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2023-01-01', periods=n_scenes, freq='5D')
+    t = np.arange(n_scenes) / n_scenes
+
+    peak = rng.uniform(0.2, 0.8, (n_parcels, 1))
+    ndvi = 0.2 + 0.6 * np.exp(-((t - peak) ** 2) / 0.02) + rng.normal(0, 0.03, (n_parcels, n_scenes))
+
+    harvest = rng.random(n_parcels) < harvested
+    harvest_index = np.round(peak[:, 0] * n_scenes).astype(int) + 2
+    after_harvest = harvest[:, None] & (np.arange(n_scenes)[None, :] >= harvest_index[:, None])
+    ndvi = np.where(after_harvest, 0.2 + rng.normal(0, 0.03, ndvi.shape), ndvi)
+    keep = rng.random((n_parcels, n_scenes)) > missing
+
+    parcel_index, scene_index = np.nonzero(keep)
+    ids = np.char.add('P', np.arange(n_parcels).astype(str))
+    df = pd.DataFrame({
+        'parcel_id': ids[parcel_index],
+        'date': dates.values[scene_index],
+        'ndvi_mean': ndvi[parcel_index, scene_index],
+    })
+    return df, set(ids[harvest])
+
+
+def timed(label, function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    print(f'{label:<22} {time.perf_counter() - start:8.3f} s')
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--parcels', type=int, default=20000)
+    parser.add_argument('--scenes', type=int, default=73)
+    parser.add_argument('--harvested', type=float, default=0.1, help='fração das parcelas com colheita')
+    args = parser.parse_args()
+
+    df, harvested = synthetic_data(args.parcels, args.scenes, harvested=args.harvested)
+    print(f'{args.parcels} parcelas, {args.scenes} datas, {len(df)} observações')
+
+    start = time.perf_counter()
+    parcel_ids, dates, matrix = timed('build_matrix', build_matrix, df)
+    filled = timed('fill_gaps', fill_gaps, matrix)
+    smoothed = timed('savgol_smooth', savgol_smooth, filled)
+    metrics = timed('phenology_metrics', phenology_metrics, smoothed, dates, parcel_ids, 0.5, 0.2, matrix)
+    print(f'{"total":<22} {time.perf_counter() - start:8.3f} s')
+
+    is_harvested = metrics['parcel_id'].isin(harvested)
+    detected = metrics['harvest_detected']
+    detection_rate = detected[is_harvested].mean() if is_harvested.any() else 1.0
+    false_positive_rate = detected[~is_harvested].mean() if (~is_harvested).any() else 0.0
+    print(f'colheitas detectadas: {int(detected[is_harvested].sum())} de {int(is_harvested.sum())} '
+          f'({detection_rate:.1%}); falsos positivos: {int(detected[~is_harvested].sum())} '
+          f'({false_positive_rate:.2%})')
+
+    if detection_rate < MIN_DETECTION_RATE or false_positive_rate > MAX_FALSE_POSITIVE_RATE:
+        print('ERRO: detecção de colheita fora dos limites')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
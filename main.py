@@ -1,5 +1,8 @@
+import sys
+
 from src.data_processing import DataProcessor
-from src.data_visualization import NDVIVisualization
+from src.metrics import metrics
+from src.render_pipeline import RenderPipeline
 
 if __name__ == '__main__':
 
@@ -11,12 +14,19 @@ if __name__ == '__main__':
     # Salva imagens com filtro do NDVI direto do GEE
     DataProcessor.get_montly_images()
 
-    NDVIVisualization = NDVIVisualization(df_data=df, start_date='2023-01-01', feature=feature)
+    # Plota todos os mapas e gráficos utilizados para a visualização de dados, em paralelo e
+    # refazendo apenas as saídas cujos dados de entrada mudaram. O mapa usa a geometria do shapefile
+    # e os heatmaps baixados, sem chamadas ao Earth Engine
+    status = RenderPipeline().run(df_data=df, start_date='2023-01-01', feature=DataProcessor.roi)
+
+    # Com AGRO_METRICS=1, grava os tempos de cada etapa e os contadores de chamadas remotas
+    if metrics.enabled:
+        metrics.to_json('data/results/run_metrics.json')
+        metrics.to_prometheus('data/results/run_metrics.prom')
 
-    # Plota todos os mapas e gráficos utilizados para a visualização de dados
-    NDVIVisualization.plot_ndvi_data()
-    NDVIVisualization.plot_histograma_freq()
-    NDVIVisualization.plot_mapdisplay()
-    NDVIVisualization.plot_timeseries()
-    NDVIVisualization.plot_boxplot()
-    NDVIVisualization.plot_images_timelapse()
+    # Saídas que falharam podem ter ficado com a versão antiga em disco; o processo termina com erro
+    failures = RenderPipeline.failures(status)
+    if failures:
+        for key, state in failures.items():
+            print(f'{key}: {state}', file=sys.stderr)
+        sys.exit(1)
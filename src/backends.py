@@ -0,0 +1,195 @@
+import numpy as np
+import pandas as pd
+
+from src.histograms import bin_edges, rebin
+from src.streaming import StreamingStats
+
+
+class ComputeBackend:
+    """Interface dos backends de cálculo do DataProcessor.
+
+    Um backend recebe o período e a geometria de interesse e devolve uma lista de registros com
+    'date', 'scene_id' e as estatísticas ndvi_mean, ndvi_max, ndvi_min, ndvi_median e ndvi_stdDev,
+    no mesmo formato usado pelo get_all_data, mais ndvi_histogram quando o processor pede histogramas.
+    """
+
+    name = None
+
+    def prepare_roi(self, processor):
+        """Prepara a geometria da região no formato do backend, uma vez, antes das cópias do processor
+        por período (que a compartilham); retorna essa geometria"""
+        return processor.roi
+
+    def get_stats(self, processor, s_date, e_date, geom=None):
+        raise NotImplementedError
+
+
+class EarthEngineBackend(ComputeBackend):
+    """Backend padrão: NDVI e reducer combinado calculados no Google Earth Engine"""
+
+    name = 'earthengine'
+
+    def prepare_roi(self, processor):
+        return processor.roi_ee
+
+    def get_stats(self, processor, s_date, e_date, geom=None):
+        roi_ee = processor.roi_ee if geom is None else processor.get_ee_geometry(geom)
+        collection_with_ndvi = processor.get_image_collection(s_date, e_date, roi_ee)
+        return processor.get_stats_batched(collection_with_ndvi, processor.get_combined_reducer(histogram=True),
+                                           roi_ee)
+
+
+class LocalScene:
+    """Cena local com as bandas B4 e B8 em arrays (ou memory-maps) 2D no mesmo grid.
+
+    O transform segue a convenção do GDAL sem rotação: (x do canto superior esquerdo, largura do
+    pixel, y do canto superior esquerdo, altura do pixel negativa), no crs do raster (ex.: 'EPSG:32723'
+    para o UTM 23S do Sentinel-2). Sem crs, as coordenadas são as do shapefile.
+    """
+
+    def __init__(self, scene_id, date, b4, b8, transform, cloud_percentage=0, crs=None):
+        if b4.shape != b8.shape:
+            raise ValueError(f'As bandas B4 {b4.shape} e B8 {b8.shape} da cena {scene_id} têm formatos diferentes')
+
+        self.scene_id = scene_id
+        self.date = date
+        self.b4 = b4
+        self.b8 = b8
+        self.transform = transform
+        self.cloud_percentage = cloud_percentage
+        self.crs = crs
+
+    @classmethod
+    def from_npy(cls, scene_id, date, b4_path, b8_path, transform, cloud_percentage=0, crs=None):
+        """Abre as bandas salvas em .npy como memory-map, sem carregar o raster inteiro na memória"""
+        b4 = np.load(b4_path, mmap_mode='r')
+        b8 = np.load(b8_path, mmap_mode='r')
+        return cls(scene_id, date, b4, b8, transform, cloud_percentage, crs)
+
+
+class NumpyBackend(ComputeBackend):
+    """Backend local: calcula NDVI e as estatísticas do reducer combinado com NumPy.
+
+    A geometria é reprojetada do crs do shapefile para o de cada cena e apenas a janela do raster que a
+    cobre é lida, em blocos de chunk_rows linhas; a máscara da geometria é rasterizada pelos centros dos
+    pixels, como no reduceRegion do Earth Engine. Cenas que a geometria não toca são puladas (como no
+    filterBounds). A mediana é aproximada pelo histograma do StreamingStats (erro máximo de 0.001).
+    """
+
+    name = 'numpy'
+
+    def __init__(self, scenes, chunk_rows=512):
+        self.scenes = scenes
+        self.chunk_rows = chunk_rows
+
+    @staticmethod
+    def get_window(geom, transform, shape):
+        """Linhas e colunas do raster que contêm o retângulo envolvente da geometria"""
+        x0, dx, y0, dy = transform
+        minx, miny, maxx, maxy = geom.bounds
+
+        col_start = max(int(np.floor((minx - x0) / dx)), 0)
+        col_stop = min(int(np.ceil((maxx - x0) / dx)), shape[1])
+        row_start = max(int(np.floor((maxy - y0) / dy)), 0)
+        row_stop = min(int(np.ceil((miny - y0) / dy)), shape[0])
+
+        return row_start, row_stop, col_start, col_stop
+
+    @staticmethod
+    def to_scene_crs(geom, crs, scene):
+        """Geometria nas coordenadas do raster da cena"""
+        if scene.crs is None or crs is None:
+            return geom
+
+        import geopandas as gpd
+
+        return gpd.GeoSeries([geom], crs=crs).to_crs(scene.crs).iloc[0]
+
+    @classmethod
+    def overlaps(cls, geom, scene):
+        row_start, row_stop, col_start, col_stop = cls.get_window(geom, scene.transform, scene.b4.shape)
+        return row_start < row_stop and col_start < col_stop
+
+    @staticmethod
+    def rasterize(geom, transform, row_start, row_stop, col_start, col_stop):
+        """Máscara booleana dos pixels cujo centro está dentro da geometria"""
+        import shapely
+
+        x0, dx, y0, dy = transform
+        xs = x0 + (np.arange(col_start, col_stop) + 0.5) * dx
+        ys = y0 + (np.arange(row_start, row_stop) + 0.5) * dy
+        xx, yy = np.meshgrid(xs, ys)
+        return shapely.contains_xy(geom, xx, yy)
+
+    @staticmethod
+    def calculate_ndvi(b4, b8):
+        """NDVI = (B8 - B4) / (B8 + B4), em float64; pixels com soma zero resultam em NaN"""
+        red = np.asarray(b4, dtype=np.float64)
+        nir = np.asarray(b8, dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (nir - red) / (nir + red)
+
+    def iter_ndvi_chunks(self, scene, geom):
+        """Percorre a janela da geometria em blocos de linhas, gerando os valores de NDVI válidos"""
+        row_start, row_stop, col_start, col_stop = self.get_window(geom, scene.transform, scene.b4.shape)
+
+        for chunk_start in range(row_start, row_stop, self.chunk_rows):
+            chunk_stop = min(chunk_start + self.chunk_rows, row_stop)
+            mask = self.rasterize(geom, scene.transform, chunk_start, chunk_stop, col_start, col_stop)
+            if not mask.any():
+                continue
+
+            ndvi = self.calculate_ndvi(scene.b4[chunk_start:chunk_stop, col_start:col_stop],
+                                       scene.b8[chunk_start:chunk_stop, col_start:col_stop])
+            values = ndvi[mask]
+            yield values[np.isfinite(values)]
+
+    def reduce_scene(self, scene, geom, histogram_bins=None):
+        """Estatísticas de NDVI de uma cena sobre a geometria, com os mesmos nomes do reducer combinado.
+
+        Os blocos são consumidos pelo StreamingStats, então a memória não cresce com o tamanho do raster.
+        Com histogram_bins, o histograma do StreamingStats é reagrupado nesse número de bins e devolvido
+        em NDVI_histogram no formato do ee.Reducer.fixedHistogram.
+        """
+        stats = StreamingStats()
+        for values in self.iter_ndvi_chunks(scene, geom):
+            stats.update(values)
+
+        result = stats.result()
+        if histogram_bins and stats.count:
+            starts = bin_edges(histogram_bins, stats.value_range)[:-1]
+            result['NDVI_histogram'] = [[float(start), int(count)]
+                                        for start, count in zip(starts, rebin(stats.histogram, histogram_bins))]
+        return result
+
+    def get_stats(self, processor, s_date, e_date, geom=None):
+        if tuple(processor.indices) != ('NDVI',):
+            raise ValueError('O NumpyBackend calcula apenas o NDVI (as cenas locais só têm as bandas B4 e B8)')
+
+        geom = processor.roi if geom is None else geom
+        s_date = pd.Timestamp(s_date).strftime('%Y-%m-%d')
+        e_date = pd.Timestamp(e_date).strftime('%Y-%m-%d')
+
+        all_data = []
+        in_period = 0
+        projected = {}
+        for scene in self.scenes:
+            if not s_date <= scene.date < e_date or scene.cloud_percentage >= processor.cloud_coverage_threshold:
+                continue
+            in_period += 1
+
+            if scene.crs not in projected:
+                projected[scene.crs] = self.to_scene_crs(geom, processor.crs if scene.crs else None, scene)
+            scene_geom = projected[scene.crs]
+            if not self.overlaps(scene_geom, scene):
+                continue
+
+            data = processor.stats_from_properties(scene.date,
+                                                   self.reduce_scene(scene, scene_geom, processor.histogram_bins))
+            data['scene_id'] = scene.scene_id
+            all_data.append(data)
+
+        if in_period and not all_data:
+            raise ValueError(f'A geometria {geom.bounds} não cobre nenhuma das {in_period} cenas do período; '
+                             'confira o crs das cenas (LocalScene(crs=...)) e do shapefile')
+        return all_data
@@ -0,0 +1,211 @@
+"""Backfill de séries longas (vários anos) em janelas de tempo com checkpoint em disco.
+
+O intervalo [start_date, end_date) é dividido em janelas (trimestrais por padrão) processadas em
+paralelo. Cada janela concluída sem erros é gravada em um Parquet próprio, de forma atômica; ao
+rodar o mesmo job de novo, as janelas já gravadas são puladas e só as que faltam (ou falharam) são
+consultadas. Uma janela que ainda não terminou (fim depois de hoje) é gravada como parcial e consultada
+de novo em toda execução, até terminar. No fim, as janelas são unidas e os registros repetidos da mesma
+parcela e data descartados.
+
+Os checkpoints ficam em <checkpoint_dir>/<shapefile>_<chave>, onde a chave é o hash das geometrias e
+dos parâmetros que mudam o resultado (modo, índices, escala, limite de nuvens, backend e bins do
+histograma); mudar qualquer um deles começa um job novo sem misturar resultados.
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from src.metrics import metrics
+
+
+def split_windows(start_date, end_date, freq='3MS'):
+    """Janelas [início, fim) que cobrem o intervalo, como strings 'YYYY-MM-DD'. A primeira e a última
+    são cortadas nos limites pedidos"""
+    start = pd.Timestamp(start_date)
+    end = pd.Timestamp(end_date)
+    if start >= end:
+        raise ValueError(f'Intervalo vazio: {start_date} a {end_date}')
+
+    boundaries = [start] + [b for b in pd.date_range(start=start, end=end, freq=freq) if start < b < end] + [end]
+    return [(s.strftime('%Y-%m-%d'), e.strftime('%Y-%m-%d')) for s, e in zip(boundaries[:-1], boundaries[1:])]
+
+
+class BackfillJob:
+    """Job de backfill retomável sobre um DataProcessor.
+
+    Com mode='parcels' cada janela passa pelo collect_parcels_data (por tile ou por parcela); com
+    mode='roi' a geometria inteira do shapefile é reduzida pelo backend do processor, com o nome do
+    shapefile como parcel_id. Todas as janelas compartilham o cliente, o agendador (e portanto a cota
+    de requisições) e as geometrias preparadas do processor.
+    """
+
+    def __init__(self, processor, start_date, end_date, freq='3MS', mode='parcels', id_column='cod_imovel',
+                 checkpoint_dir='data/cache/backfill', max_workers=4, parcel_workers=4, by_tile=True,
+                 max_features=5000):
+        if mode not in ('parcels', 'roi'):
+            raise ValueError(f"mode deve ser 'parcels' ou 'roi', não {mode!r}")
+
+        self.processor = processor
+        self.windows = split_windows(start_date, end_date, freq)
+        self.mode = mode
+        self.id_column = id_column
+        self.checkpoint_dir = checkpoint_dir
+        self.max_workers = max_workers
+        self.parcel_workers = parcel_workers
+        self.by_tile = by_tile
+        self.max_features = max_features
+        self.name = os.path.splitext(os.path.basename(processor.shapefile_path))[0]
+
+    def load_geometries(self):
+        """Geometrias do job: as parcelas indexadas pelo ID ou a região inteira do shapefile.
+
+        O cache de geometrias (e, no modo roi, a geometria da região no formato do backend) é criado aqui,
+        antes das cópias do processor por janela, para que todas as janelas usem os mesmos objetos.
+        """
+        cache = self.processor.geometry_cache
+        if self.mode == 'parcels':
+            return self.processor.get_parcels(self.id_column)
+
+        self.processor.backend.prepare_roi(self.processor)
+        cache.save()
+        return pd.Series([self.processor.roi], index=[self.name])
+
+    def job_key(self, geometries):
+        """Hash das geometrias e dos parâmetros que definem o conteúdo dos checkpoints"""
+        digest = hashlib.sha1()
+        for parcel_id, geom in geometries.items():
+            digest.update(str(parcel_id).encode())
+            digest.update(geom.wkb)
+
+        processor = self.processor
+        params = {
+            'mode': self.mode,
+            'geometries': digest.hexdigest(),
+            'indices': list(processor.indices),
+            'scale': processor.scale,
+            'cloud_coverage_threshold': processor.cloud_coverage_threshold,
+            'backend': processor.backend.name,
+            'histogram_bins': processor.histogram_bins,
+        }
+        return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:12]
+
+    @staticmethod
+    def window_path(job_dir, window, partial=False):
+        start, end = window
+        return os.path.join(job_dir, f'window_{start}_{end}{".partial" if partial else ""}.parquet')
+
+    @classmethod
+    def checkpoint_path(cls, job_dir, window):
+        """Checkpoint gravado da janela (o definitivo ou, se ainda não houver, o parcial) ou None"""
+        for partial in (False, True):
+            path = cls.window_path(job_dir, window, partial)
+            if os.path.exists(path):
+                return path
+        return None
+
+    @staticmethod
+    def is_open(window):
+        """Janela que ainda não terminou: cenas novas podem aparecer nela"""
+        return window[1] > datetime.now().strftime('%Y-%m-%d')
+
+    def process_window(self, window, geometries):
+        """Consulta uma janela; retorna (DataFrame com parcel_id e record_columns, DataFrame de erros)"""
+        processor = self.processor.for_period(*window)
+
+        if self.mode == 'parcels':
+            return processor.collect_parcels_data(geometries, self.parcel_workers, self.by_tile, self.max_features)
+
+        records = processor.backend.get_stats(processor, *window)
+        df = pd.DataFrame(records, columns=processor.record_columns).drop_duplicates(subset='date', keep='last')
+        df.insert(0, 'parcel_id', self.name)
+        return df, pd.DataFrame(columns=['parcel_id', 'error'])
+
+    def save_window(self, path, df):
+        """Grava o checkpoint da janela de forma atômica"""
+        tmp_path = f'{path}.tmp'
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+    def run_window(self, window, geometries, job_dir):
+        with metrics.span('backfill.window'):
+            df, errors = self.process_window(window, geometries)
+
+        # Janelas com falhas não são gravadas, então a próxima execução as consulta de novo por inteiro;
+        # janelas abertas ficam como parciais, que não contam como concluídas
+        if errors.empty:
+            is_open = self.is_open(window)
+            self.save_window(self.window_path(job_dir, window, partial=is_open), df)
+            if not is_open and os.path.exists(self.window_path(job_dir, window, partial=True)):
+                os.remove(self.window_path(job_dir, window, partial=True))
+            metrics.increment('backfill_windows_done')
+        else:
+            metrics.increment('backfill_windows_failed')
+        return errors
+
+    @metrics.timed()
+    def run(self, store=None, output_path='data/processed/ndvi_backfill.csv'):
+        """Processa as janelas que ainda não têm checkpoint e une todas as concluídas.
+
+        Retorna um DataFrame no formato longo (uma linha por parcela e data, sem os histogramas) e um
+        DataFrame de erros com as colunas start_date, end_date, parcel_id e error; se houver erros, o
+        resultado cobre só as janelas concluídas e basta rodar o job de novo para completar. Se um
+        NDVIStore for informado, só os registros das janelas consultadas nesta execução (com os histogramas)
+        que ele ainda não tem são acrescentados a ele; as retomadas de checkpoint já foram gravadas pela
+        execução que as concluiu.
+        """
+        if store is not None:
+            store.validate_columns(self.processor.stats_columns)
+
+        geometries = self.load_geometries()
+        job_dir = os.path.join(self.checkpoint_dir, f'{self.name}_{self.job_key(geometries)}')
+        os.makedirs(job_dir, exist_ok=True)
+
+        pending = [window for window in self.windows if not os.path.exists(self.window_path(job_dir, window))]
+        metrics.increment('backfill_windows_resumed', len(self.windows) - len(pending))
+
+        all_errors = []
+        finished = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.run_window, window, geometries, job_dir): window for window in pending}
+
+            for future in as_completed(futures):
+                start, end = futures[future]
+                try:
+                    errors = future.result()
+                except Exception as e:
+                    errors = pd.DataFrame([{'parcel_id': None, 'error': repr(e)}])
+                if errors.empty:
+                    finished.append((start, end))
+                else:
+                    all_errors.append(errors.assign(start_date=start, end_date=end))
+
+        if store is not None:
+            new = store.missing(self.merge(job_dir, finished))
+            if not new.empty:
+                store.append(new)
+
+        df = self.merge(job_dir)
+
+        df = df[['parcel_id'] + self.processor.stats_columns]
+        if output_path is not None:
+            df.to_csv(output_path, index=False)
+
+        errors = pd.concat(all_errors, ignore_index=True) if all_errors else pd.DataFrame()
+        return df, errors.reindex(columns=['start_date', 'end_date', 'parcel_id', 'error'])
+
+    def merge(self, job_dir, windows=None):
+        """Une os checkpoints das janelas (todas as do job por padrão), mantendo um registro por parcela e data"""
+        windows = self.windows if windows is None else [window for window in self.windows if window in windows]
+        paths = [self.checkpoint_path(job_dir, window) for window in windows]
+        frames = [pd.read_parquet(path) for path in paths if path is not None]
+        frames = [df for df in frames if not df.empty]
+        if not frames:
+            return pd.DataFrame(columns=['parcel_id'] + self.processor.record_columns)
+
+        df = pd.concat(frames, ignore_index=True)
+        return (df.drop_duplicates(subset=['parcel_id', 'date'], keep='last')
+                .sort_values(['parcel_id', 'date'], ignore_index=True))
@@ -1,39 +1,134 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-import ee
-import geopandas as gpd
-import numpy as np
+import copy
+from functools import cached_property
+import os
+import threading
 import base64
 import pandas as pd
-import requests
-from PIL import Image
-from io import BytesIO
 from dateutil.relativedelta import relativedelta
 
+from src.backends import EarthEngineBackend
+from src.geometry import GeometryCache, prepare_geometry
+from src.maps import read_heatmap_region, region_key, write_heatmap_region
+from src.histograms import HISTOGRAM_BINS, HISTOGRAM_RANGE, counts_from_pairs
+from src.indices import STATISTICS, add_index_bands, stats_columns, validate_indices
+from src.metrics import metrics
+from src.scheduler import RemoteScheduler
+from src.spatial_index import ParcelIndex
+from src.stats_cache import SceneStatsCache
+from src.timelapse import NDVI_PALETTE
+
+STATS_COLUMNS = ['date', 'ndvi_mean', 'ndvi_max', 'ndvi_min', 'ndvi_median', 'ndvi_stdDev']
+REDUCERS = ('mean', 'min', 'max', 'stdDev', 'median')
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+PNG_TRAILER = b'IEND\xaeB`\x82'
+
+
 class DataProcessor:
-    def __init__(self, shapefile_path, start_date, cloud_coverage_threshold=20):
+    def __init__(self, shapefile_path, start_date, cloud_coverage_threshold=20, ee_client=None,
+                 cache_dir='data/cache', scale=10, backend=None, scheduler=None, indices=('NDVI',),
+                 histogram_bins=HISTOGRAM_BINS, end_date=None):
 
-        ee.Initialize(project='merxproject-430516')
+        # O cliente do Earth Engine pode ser injetado (ex.: um fake local para contar as chamadas remotas).
+        # A inicialização só acontece no primeiro uso, então criar o DataProcessor não acessa a rede.
+        self._ee_client = ee_client
+        self._ee = None
+        self._ee_lock = threading.Lock()
 
         self.shapefile_path = shapefile_path
         self.start_date_str = start_date
         self.start_date = datetime.strptime(self.start_date_str, '%Y-%m-%d')
-        self.end_date = self.start_date + relativedelta(years=1)
+        # Fim do período (exclusivo); sem end_date o período é de um ano. Para vários anos, use o
+        # BackfillJob (src/backfill.py), que divide o intervalo em janelas com checkpoint
+        if end_date is None:
+            self.end_date = self.start_date + relativedelta(years=1)
+        else:
+            self.end_date = datetime.strptime(end_date, '%Y-%m-%d')
         self.cloud_coverage_threshold = cloud_coverage_threshold
-        self.roi = self.get_polygon()
-        self.roi_ee = self.get_ee_geometry(self.roi)
-        self.ee_feature = self.get_ee_feature(self.roi_ee)
+        self.cache_dir = cache_dir
+        self.scale = scale
+        # Backend de cálculo das estatísticas (Earth Engine por padrão, ou NumpyBackend para imagens locais)
+        self.backend = backend if backend is not None else EarthEngineBackend()
+        # Toda chamada remota passa pelo agendador (limite de taxa, novas tentativas e coalescência);
+        # vários DataProcessor podem compartilhar o mesmo agendador para dividir a cota
+        self.scheduler = scheduler if scheduler is not None else RemoteScheduler()
+        # Índices espectrais calculados e reduzidos em cada cena (src/indices.py); com o padrão ('NDVI',)
+        # a saída mantém as colunas ndvi_mean, ndvi_max, ndvi_min, ndvi_median e ndvi_stdDev
+        self.indices = validate_indices(indices)
+        self.stats_columns = ['date'] + stats_columns(self.indices)
+        # Histograma de pixels de NDVI por cena (src/histograms.py), guardado no cache e no NDVIStore;
+        # histogram_bins=None desliga
+        self.histogram_bins = histogram_bins
+        self.record_columns = self.stats_columns + (['ndvi_histogram'] if histogram_bins else [])
+
+    def for_period(self, start_date, end_date):
+        """Cópia do processor para [start_date, end_date) que compartilha cliente, agendador e geometrias"""
+        processor = copy.copy(self)
+        processor.start_date_str = start_date
+        processor.start_date = datetime.strptime(start_date, '%Y-%m-%d')
+        processor.end_date = datetime.strptime(end_date, '%Y-%m-%d')
+        return processor
+
+    @property
+    def ee(self):
+        """Cliente do Earth Engine, importado e inicializado apenas no primeiro uso"""
+        if self._ee is None:
+            with self._ee_lock:
+                if self._ee is None:
+                    client = self._ee_client
+                    if client is None:
+                        import ee as client
+                    client.Initialize(project='merxproject-430516')
+                    self._ee = client
+        return self._ee
+
+    @cached_property
+    def roi(self):
+        return self.get_polygon()
+
+    @cached_property
+    def crs(self):
+        """CRS do shapefile, o das geometrias de roi e get_parcels"""
+        import geopandas as gpd
+
+        return gpd.read_file(self.shapefile_path, rows=1).crs
+
+    @cached_property
+    def roi_ee(self):
+        roi_ee = self.get_ee_geometry(self.roi)
+        self.geometry_cache.save()
+        return roi_ee
+
+    @cached_property
+    def geometry_cache(self):
+        return GeometryCache(self.cache_dir, os.path.splitext(os.path.basename(self.shapefile_path))[0])
+
+    @cached_property
+    def ee_feature(self):
+        return self.get_ee_feature(self.roi_ee)
+
+    def get_ee_geometry(self, geom):
+        """Converte a geometria (simplificada e guardada no cache de geometrias) no Poligono do Earth Engine"""
+        geometry_type, coordinates = self.geometry_cache.encode(geom, self.scale)
+        if geometry_type == 'MultiPolygon':
+            return self.ee.Geometry.MultiPolygon(coordinates)
+        return self.ee.Geometry.Polygon(coordinates)
+
+    def get_ee_feature(self, roi_ee):
+        """Converte a Geometria em Earth Engine Feature."""
+        return self.ee.Feature(roi_ee)
 
     @staticmethod
-    def get_ee_geometry(geom):
-        """Converte as coordenadas da geometria no Poligono do Earth Engine."""
-        x, y = geom.exterior.coords.xy
-        coords = np.dstack((x, y)).tolist()
-        return ee.Geometry.Polygon(coords)
+    def _get_info(ee_object):
+        metrics.increment('ee_getinfo_calls')
+        with metrics.span('ee.getInfo'):
+            return ee_object.getInfo()
 
-    @staticmethod
-    def get_ee_feature(roi_ee):
-        """Converte a Geometria em Earth Engine Feature."""
-        return ee.Feature(roi_ee)
+    def get_info(self, ee_object):
+        """getInfo pelo agendador; a mesma computação pedida por várias threads ao mesmo tempo vai uma vez só"""
+        key = ('getInfo', self.scheduler.fingerprint(ee_object))
+        return self.scheduler.call(self._get_info, ee_object, key=key)
 
     @staticmethod
     def encode_image(image_path):
@@ -53,97 +148,485 @@ class DataProcessor:
         #ndvi = image.normalizedDifference(['B8', 'B4']).rename('NDVI')
         return image.addBands(ndvi)
 
+    def calculate_indices(self, image):
+        """Acrescenta o NDVI e os demais índices pedidos como bandas da imagem, em uma única função mapeada"""
+        # O NDVI vem sempre do calculate_ndvi, pois as composições e os thumbnails usam a banda NDVI
+        image = self.calculate_ndvi(image)
+        return add_index_bands(image, [name for name in self.indices if name != 'NDVI'])
+
+    @metrics.timed()
     def get_polygon(self):
         """Lê um shapefile e retorna a geometria da primeira e única propriedade"""
+        import geopandas as gpd
+
         df = gpd.read_file(self.shapefile_path)
         return df.iloc[0]['geometry']
 
-    def get_image_collection(self, s_date, e_date):
+    @metrics.timed()
+    def get_parcels(self, id_column='cod_imovel'):
+        """Lê um shapefile e retorna a geometria de todas as propriedades, indexadas pelo ID da parcela"""
+        import geopandas as gpd
+
+        df = gpd.read_file(self.shapefile_path)
+        return df.set_index(id_column)['geometry']
+
+    def get_image_collection(self, s_date, e_date, roi_ee=None):
         """Recupera uma coleção de imagens pelo GEE e mapeia cada imagem da coleção para o cálculo NDVI"""
-        collection = (ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED')
-                      .filterBounds(self.roi_ee)
-                      .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', self.cloud_coverage_threshold))
+        roi_ee = self.roi_ee if roi_ee is None else roi_ee
+        collection = (self.ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED')
+                      .filterBounds(roi_ee)
+                      .filter(self.ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', self.cloud_coverage_threshold))
                       .filterDate(s_date, e_date))
 
-        collection_with_ndvi = collection.map(self.calculate_ndvi)
+        collection_with_ndvi = collection.map(self.calculate_indices)
 
         return collection_with_ndvi
 
-    def get_all_data(self):
-        """Resgata os dados de NDVI para uma região de interesse, salva em arquivo CSV e retorna os dados."""
+    def get_combined_reducer(self, histogram=False):
+        """Reducer combinado com média, mínimo, máximo, desvio padrão, mediana e, opcionalmente, histograma"""
+        reducer = (self.ee.Reducer.mean()
+                   .combine(reducer2=self.ee.Reducer.min(), sharedInputs=True)
+                   .combine(reducer2=self.ee.Reducer.max(), sharedInputs=True)
+                   .combine(reducer2=self.ee.Reducer.stdDev(), sharedInputs=True)
+                   .combine(reducer2=self.ee.Reducer.median(), sharedInputs=True))
 
-        collection_with_ndvi = self.get_image_collection(self.start_date_str, self.end_date)
+        if histogram and self.histogram_bins:
+            low, high = HISTOGRAM_RANGE
+            reducer = reducer.combine(
+                reducer2=self.ee.Reducer.fixedHistogram(low, high, self.histogram_bins).unweighted(),
+                sharedInputs=True)
 
-        image_list = collection_with_ndvi.toList(collection_with_ndvi.size())
+        return reducer
+
+    @staticmethod
+    def stats_from_properties(date, properties, indices=('NDVI',)):
+        """Monta o registro de saída (ndvi_mean, evi_mean...) a partir das propriedades reduzidas"""
+        data = {'date': date}
+        for name in indices:
+            for statistic in STATISTICS:
+                value = properties.get(f'{name}_{statistic}')
+                if value is None and len(indices) == 1:
+                    value = properties.get(statistic)
+                data[f'{name.lower()}_{statistic}'] = value
+
+        histogram = properties.get('NDVI_histogram', properties.get('histogram') if indices == ('NDVI',) else None)
+        if histogram is not None:
+            data['ndvi_histogram'] = counts_from_pairs(histogram)
+        return data
+
+    def get_stats_batched(self, collection_with_ndvi, combined_reducer, roi_ee=None):
+        """Reduz todas as cenas no servidor e traz datas e estatísticas em uma única chamada getInfo"""
+        roi_ee = self.roi_ee if roi_ee is None else roi_ee
+
+        def reduce_image(image):
+            ndvi_region = image.select(list(self.indices)).reduceRegion(
+                reducer=combined_reducer,
+                geometry=roi_ee,
+                scale=self.scale,
+                maxPixels=1e13
+            )
+            return (self.ee.Feature(None, ndvi_region)
+                    .set('date', image.date().format("yyyy-MM-dd"))
+                    .set('scene_id', image.get('system:index')))
+
+        features = self.get_info(self.ee.FeatureCollection(collection_with_ndvi.map(reduce_image)))['features']
 
         all_data = []
+        for feature in features:
+            properties = feature['properties']
+            data = self.stats_from_properties(properties.get('date'), properties, self.indices)
+            data['scene_id'] = properties.get('scene_id')
+            all_data.append(data)
 
-        combined_reducer = (ee.Reducer.mean()
-                            .combine(reducer2=ee.Reducer.min(), sharedInputs=True)
-                            .combine(reducer2=ee.Reducer.max(), sharedInputs=True)
-                            .combine(reducer2=ee.Reducer.stdDev(), sharedInputs=True)
-                            .combine(reducer2=ee.Reducer.median(), sharedInputs=True))
+        return all_data
 
-        for i in range(image_list.size().getInfo()):
-            image = ee.Image(image_list.get(i))
+    @metrics.timed()
+    def get_stats_cached(self):
+        """Busca só o que falta no cache em disco; retorna (registros do período, registros buscados agora)"""
+        cache_name = os.path.splitext(os.path.basename(self.shapefile_path))[0]
+        cache = SceneStatsCache(self.cache_dir, cache_name)
+        geometry_hash = cache.geometry_hash(prepare_geometry(self.roi, self.scale))
+        reducers = REDUCERS + ((f'fixedHistogram{self.histogram_bins}',) if self.histogram_bins else ())
+        key = cache.make_key(geometry_hash, reducers, self.scale, self.cloud_coverage_threshold, self.backend.name,
+                             self.indices)
+
+        end_date_str = self.end_date.strftime('%Y-%m-%d')
+        content = cache.load(key)
+        covered = cache.covered_intervals(content)
+        metrics.increment('scene_cache_hits' if covered else 'scene_cache_misses')
+
+        records = []
+        for query_start, query_end in cache.missing_intervals(covered, self.start_date_str, end_date_str):
+            fetched = self.backend.get_stats(self, query_start, query_end)
+            records.extend(fetched)
+            covered = cache.add_interval(covered, query_start, self.covered_until(query_start, query_end, fetched, cache))
+        metrics.increment('scenes_fetched', len(records))
+
+        scenes = cache.merge(content, records)
+        cache.save(key, covered, scenes)
+
+        return cache.records_between(scenes, self.start_date_str, end_date_str), records
+
+    @staticmethod
+    def covered_until(query_start, query_end, records, cache):
+        """Fim do trecho consultado que pode ser marcado como coberto no cache"""
+        if query_end <= datetime.now().strftime('%Y-%m-%d'):
+            return query_end
+        return cache.high_water_mark(records) or query_start
+
+    def get_stats_per_image(self, collection_with_ndvi, combined_reducer):
+        """Reduz cena a cena, com uma chamada getInfo por valor (modo antigo, mantido como alternativa)"""
+        image_list = collection_with_ndvi.toList(collection_with_ndvi.size())
+
+        all_data = []
+
+        for i in range(self.get_info(image_list.size())):
+            image = self.ee.Image(image_list.get(i))
 
             ndvi_region = image.reduceRegion(
                 reducer=combined_reducer,
                 geometry=self.roi_ee,
-                scale=10,
+                scale=self.scale,
                 maxPixels=1e13
             )
 
-            date = image.date().format("yyyy-MM-dd").getInfo()
+            date = self.get_info(image.date().format("yyyy-MM-dd"))
 
-            data = {
-                'date': date,
-                'ndvi_mean': ndvi_region.get('NDVI_mean').getInfo(),
-                'ndvi_max': ndvi_region.get('NDVI_max').getInfo(),
-                'ndvi_min': ndvi_region.get('NDVI_min').getInfo(),
-                'ndvi_median': ndvi_region.get('NDVI_median').getInfo(),
-                'ndvi_stdDev': ndvi_region.get('NDVI_stdDev').getInfo(),
-            }
+            data = {'date': date}
+            for name in self.indices:
+                for statistic in STATISTICS:
+                    data[f'{name.lower()}_{statistic}'] = self.get_info(ndvi_region.get(f'{name}_{statistic}'))
             all_data.append(data)
 
-        df = pd.DataFrame(all_data).drop_duplicates(subset='date', keep='last')
+        return all_data
+
+    @metrics.timed()
+    def get_all_data(self, batched=True, use_cache=True, store=None, parcel_id=None):
+        """Resgata os dados de NDVI para uma região de interesse, salva em arquivo CSV e retorna os dados."""
+        if store is not None:
+            store.validate_columns(self.stats_columns)
+
+        if batched and use_cache:
+            all_data, fetched = self.get_stats_cached()
+        elif batched:
+            all_data = fetched = self.backend.get_stats(self, self.start_date_str, self.end_date)
+        else:
+            collection_with_ndvi = self.get_image_collection(self.start_date_str, self.end_date)
+            all_data = fetched = self.get_stats_per_image(collection_with_ndvi, self.get_combined_reducer())
+
+        df = pd.DataFrame(all_data, columns=self.record_columns).drop_duplicates(subset='date', keep='last')
+
+        if store is not None:
+            if parcel_id is None:
+                parcel_id = os.path.splitext(os.path.basename(self.shapefile_path))[0]
+            new = pd.DataFrame(fetched, columns=self.record_columns).drop_duplicates(subset='date', keep='last')
+            new = store.missing(new, parcel_id)
+            if not new.empty:
+                store.append(new, parcel_id=parcel_id)
+
+        # Os histogramas ficam só no cache e no NDVIStore; o CSV e o DataFrame retornado têm as estatísticas
+        df = df[self.stats_columns]
         df.to_csv('data/processed/ndvi.csv', index=False)
 
-        return df, self.ee_feature
+        feature = self.ee_feature if self.backend.name == EarthEngineBackend.name else self.roi
+        return df, feature
+
+    @metrics.timed()
+    def get_parcel_data(self, parcel_id, geom):
+        """Resgata os dados de NDVI de uma única parcela, no formato longo com a coluna parcel_id"""
+        all_data = self.backend.get_stats(self, self.start_date_str, self.end_date, geom)
+
+        df = pd.DataFrame(all_data, columns=self.record_columns).drop_duplicates(subset='date', keep='last')
+        df.insert(0, 'parcel_id', parcel_id)
+        return df
+
+    def get_tile_footprints(self, parcels):
+        """Footprints dos tiles do Sentinel-2 (MGRS_TILE) sobre as parcelas e o número de cenas de cada um"""
+        from shapely.geometry import shape
+
+        bounds = self.ee.Geometry.Rectangle([float(v) for v in parcels.total_bounds])
+        collection = self.get_image_collection(self.start_date_str, self.end_date, bounds)
+
+        def tile_footprint(tile):
+            images = collection.filter(self.ee.Filter.eq('MGRS_TILE', tile))
+            footprint = images.geometry(self.scale).dissolve(self.scale)
+            return self.ee.Feature(footprint, {'tile': tile, 'scenes': images.size()})
+
+        footprints = collection.aggregate_array('MGRS_TILE').distinct().map(tile_footprint)
+        features = self.get_info(self.ee.FeatureCollection(footprints))['features']
+
+        tiles = {feature['properties']['tile']: shape(feature['geometry']) for feature in features}
+        counts = {feature['properties']['tile']: feature['properties']['scenes'] for feature in features}
+        return tiles, counts
+
+    def get_tile_stats(self, tile, parcels):
+        """Estatísticas de um grupo de parcelas de um mesmo tile no formato longo"""
+        combined_reducer = self.get_combined_reducer(histogram=True)
+        ids = {str(parcel_id): parcel_id for parcel_id in parcels.index}
+        features = self.ee.FeatureCollection([
+            self.ee.Feature(self.get_ee_geometry(geom), {'parcel_id': str(parcel_id)})
+            for parcel_id, geom in parcels.items()
+        ])
+        bounds = self.ee.Geometry.Rectangle([float(v) for v in parcels.total_bounds])
+        collection = (self.get_image_collection(self.start_date_str, self.end_date, bounds)
+                      .filter(self.ee.Filter.eq('MGRS_TILE', tile)))
+
+        def reduce_image(image):
+            date = image.date().format("yyyy-MM-dd")
+            scene_id = image.get('system:index')
+            reduced = image.select(list(self.indices)).reduceRegions(collection=features, reducer=combined_reducer,
+                                                                     scale=self.scale)
+            return reduced.map(lambda feature: self.ee.Feature(None, feature.toDictionary())
+                               .set('date', date).set('scene_id', scene_id))
+
+        info = self.get_info(self.ee.FeatureCollection(collection.map(reduce_image)).flatten())['features']
 
-    def get_montly_images(self) -> None:
-        """Faz download do terreno em png como um heatmap em relação ao valor da mediana NDVI"""
-        dates_months = list(pd.date_range(start=self.start_date, periods=12, freq='1M'))
+        all_data = []
+        for feature in info:
+            properties = feature['properties']
+            data = self.stats_from_properties(properties.get('date'), properties, self.indices)
+            data['parcel_id'] = ids[properties['parcel_id']]
+            all_data.append(data)
 
-        for date in dates_months:
-            s_date = date.replace(day=1).strftime('%Y-%m-%d')
-            e_date = date.strftime('%Y-%m-%d')
-            save_date = date.strftime('%Y%m')
+        df = pd.DataFrame(all_data, columns=['parcel_id'] + self.record_columns)
+        return df.drop_duplicates(subset=['parcel_id', 'date'], keep='last')
+
+    def get_parcels_data_per_parcel(self, parcels, max_workers=8):
+        """Uma requisição por parcela, em paralelo; retorna (DataFrames, erros)"""
+        results = []
+        errors = []
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(self.get_parcel_data, parcel_id, geom): parcel_id
+                       for parcel_id, geom in parcels.items()}
+
+            for future in as_completed(futures):
+                parcel_id = futures[future]
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    errors.append({'parcel_id': parcel_id, 'error': repr(e)})
+
+        return results, errors
+
+    def get_parcels_data_by_tile(self, parcels, max_workers=8, max_features=5000):
+        """Agrupa as parcelas por tile e reduz cada lote em uma requisição; retorna (DataFrames, erros)"""
+        tiles, counts = self.get_tile_footprints(parcels)
+        groups, _ = ParcelIndex(parcels).group_by_tiles(tiles)
+
+        batches = []
+        for tile, parcel_ids in groups.items():
+            size = max(1, max_features // max(counts[tile], 1))
+            for start in range(0, len(parcel_ids), size):
+                batches.append((tile, parcels.loc[parcel_ids[start:start + size]]))
+
+        results = []
+        errors = []
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(self.get_tile_stats, tile, batch): batch for tile, batch in batches}
+
+            for future in as_completed(futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    errors.extend({'parcel_id': parcel_id, 'error': repr(e)} for parcel_id in futures[future].index)
+
+        return results, errors
+
+    @metrics.timed()
+    def get_all_parcels_data(self, id_column='cod_imovel', max_workers=8, store=None, by_tile=True,
+                             max_features=5000):
+        """Resgata os dados de NDVI de todas as parcelas do shapefile; retorna (DataFrame, erros)"""
+        if store is not None:
+            store.validate_columns(self.stats_columns)
+
+        df, errors = self.collect_parcels_data(self.get_parcels(id_column), max_workers, by_tile, max_features)
+
+        if store is not None:
+            new = store.missing(df)
+            if not new.empty:
+                store.append(new)
+
+        df = df[['parcel_id'] + self.stats_columns]
+        df.to_csv('data/processed/ndvi_parcels.csv', index=False)
+
+        return df, errors
+
+    def collect_parcels_data(self, parcels, max_workers=8, by_tile=True, max_features=5000):
+        """Estatísticas das parcelas no período do processor, sem gravar nada; retorna (DataFrame, erros)"""
+        if by_tile and self.backend.name == EarthEngineBackend.name:
+            results, errors = self.get_parcels_data_by_tile(parcels, max_workers, max_features)
+        else:
+            results, errors = self.get_parcels_data_per_parcel(parcels, max_workers)
+        self.geometry_cache.save()
+
+        results = [df for df in results if not df.empty]
+        if results:
+            df = pd.concat(results, ignore_index=True).sort_values(['parcel_id', 'date'], ignore_index=True)
+            # Parcelas na sobreposição entre tiles aparecem em mais de um grupo
+            df = df.drop_duplicates(subset=['parcel_id', 'date'], keep='last', ignore_index=True)
+        else:
+            df = pd.DataFrame(columns=['parcel_id'] + self.record_columns)
+
+        return df, pd.DataFrame(errors, columns=['parcel_id', 'error'])
+
+    def get_periods(self, freq='MS'):
+        """Limites [início, fim) dos períodos de composição (mensal 'MS', quinzenal '14D', semanal '7D'...)"""
+        start = self.start_date.replace(day=1) if freq == 'MS' else self.start_date
+        boundaries = list(pd.date_range(start=start, end=self.end_date, freq=freq))
+        if boundaries[-1] < self.end_date:
+            boundaries.append(pd.Timestamp(self.end_date))
+        return list(zip(boundaries[:-1], boundaries[1:]))
+
+    def get_composites(self, freq='MS', roi_ee=None):
+        """Composições medianas de NDVI por período, como uma lista de (início do período, ee.Image)"""
+        roi_ee = self.roi_ee if roi_ee is None else roi_ee
+        periods = self.get_periods(freq)
+        collection = self.get_image_collection(periods[0][0].strftime('%Y-%m-%d'),
+                                               periods[-1][1].strftime('%Y-%m-%d'), roi_ee).select('NDVI')
+
+        composites = []
+        for s_date, e_date in periods:
+            period = collection.filterDate(s_date.strftime('%Y-%m-%d'), e_date.strftime('%Y-%m-%d'))
+            image = period.median().set('period', s_date.strftime('%Y-%m-%d')).set('n_scenes', period.size())
+            composites.append((s_date, image))
+
+        return composites
+
+    def get_composite_stats(self, composites, roi_ee=None):
+        """Estatísticas do reducer combinado de todas as composições em uma única chamada getInfo"""
+        roi_ee = self.roi_ee if roi_ee is None else roi_ee
+        combined_reducer = self.get_combined_reducer()
+
+        features = [
+            self.ee.Feature(None, image.reduceRegion(
+                reducer=combined_reducer,
+                geometry=roi_ee,
+                scale=self.scale,
+                maxPixels=1e13
+            )).set('period', image.get('period')).set('n_scenes', image.get('n_scenes'))
+            for _, image in composites
+        ]
 
-            collection_with_ndvi = self.get_image_collection(s_date, e_date)
+        info = self.get_info(self.ee.FeatureCollection(features))['features']
 
-            image = collection_with_ndvi.select('NDVI')
+        all_data = []
+        for feature in info:
+            properties = feature['properties']
+            data = self.stats_from_properties(properties.get('period'), properties)
+            data['n_scenes'] = properties.get('n_scenes')
+            all_data.append(data)
 
-            mediana = image.median().clip(self.roi_ee)
+        return all_data
 
-            download_url = mediana.getThumbURL({
-                'region': self.roi_ee,
-                'dimensions': '512x512',
-                'min': -1,
-                'max': 1,
-                'bands': ['NDVI'],
-                'palette': [
-                    'ffffff', 'ce7e45', 'df923d', 'f1b555', 'fcd163', '99b718', '74a901',
-                    '66a000', '529400', '3e8601', '207401', '056201', '004c00', '023b01',
-                    '012e01', '011d01', '011301'
-                ],
+    def get_composite_thumb_url(self, image, roi_ee=None):
+        """Gera a URL do thumbnail PNG de uma composição, colorida pela paleta NDVI"""
+        roi_ee = self.roi_ee if roi_ee is None else roi_ee
+        image = image.clip(roi_ee)
+        params = {
+            'region': roi_ee,
+            'dimensions': '512x512',
+            'min': -1,
+            'max': 1,
+            'bands': ['NDVI'],
+            'palette': NDVI_PALETTE,
 
-                'format': 'png'})
+            'format': 'png'}
 
-            response = requests.get(download_url)
-            imagem = Image.open(BytesIO(response.content))
+        options = {k: v for k, v in params.items() if k != 'region'}
+        key = ('getThumbURL', self.scheduler.fingerprint(image, roi_ee, options))
+        return self.scheduler.call(self._get_thumb_url, image, params, key=key)
 
-            imagem.save(f'data/results/ndvi_{save_date}.png', 'PNG')
+    @staticmethod
+    def _get_thumb_url(image, params):
+        metrics.increment('ee_thumb_url_calls')
+        return image.getThumbURL(params)
+
+    @metrics.timed()
+    def get_composites_batch(self, freq='MS', thumbnails=True, max_workers=6):
+        """Estatísticas medianas por período e URLs dos thumbnails a partir das mesmas composições"""
+        composites = self.get_composites(freq)
+        df = pd.DataFrame(self.get_composite_stats(composites), columns=STATS_COLUMNS + ['n_scenes'])
+        df = df.rename(columns={'date': 'period'})
+
+        if thumbnails:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                urls = executor.map(lambda composite: self.get_composite_thumb_url(composite[1]), composites)
+                periods = [s_date.strftime('%Y-%m-%d') for s_date, _ in composites]
+                df['thumb_url'] = df['period'].map(dict(zip(periods, urls)))
+
+        return df
+
+    @staticmethod
+    def get_http_session(pool_size=10):
+        """Sessão HTTP compartilhada (keep-alive) com pool de conexões e sem novas tentativas próprias"""
+        import requests
+        from requests.adapters import HTTPAdapter
 
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
 
-processor = DataProcessor('data/raw/batista.shp', '2023-01-01', '2023-12-30')
+    @staticmethod
+    def is_valid_png(path):
+        """Verifica se o arquivo existe e é um PNG completo (assinatura e chunk IEND no final)"""
+        if not os.path.exists(path) or os.path.getsize(path) < len(PNG_SIGNATURE) + len(PNG_TRAILER):
+            return False
+
+        with open(path, 'rb') as f:
+            header = f.read(len(PNG_SIGNATURE))
+            f.seek(-len(PNG_TRAILER), os.SEEK_END)
+            trailer = f.read()
+
+        return header == PNG_SIGNATURE and trailer == PNG_TRAILER
+
+    @staticmethod
+    def download_file(session, url, path, timeout=60, chunk_size=64 * 1024):
+        """Faz o download em streaming direto para o disco; o arquivo final só aparece quando completo"""
+        tmp_path = f'{path}.part'
+        metrics.increment('http_requests')
+        with metrics.span('http.download'), session.get(url, stream=True, timeout=timeout) as response:
+            response.raise_for_status()
+            with open(tmp_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    f.write(chunk)
+                    metrics.increment('http_bytes_downloaded', len(chunk))
+        os.replace(tmp_path, path)
+        return path
+
+    def download_composite_image(self, image, path, session, timeout=60):
+        """Baixa o heatmap NDVI de uma composição direto para o disco"""
+        download_url = self.get_composite_thumb_url(image)
+
+        return self.scheduler.call(self.download_file, session, download_url, path, timeout=timeout,
+                                   key=('download', path))
+
+    @metrics.timed()
+    def get_montly_images(self, max_workers=6, timeout=60, overwrite=False, session=None) -> None:
+        """Faz download do terreno em png como um heatmap em relação ao valor da mediana NDVI"""
+        composites = self.get_composites('MS')[:12]
+        key = region_key(self.roi)
+
+        pending = []
+        for s_date, image in composites:
+            path = f"data/results/ndvi_{s_date.strftime('%Y%m')}.png"
+            region = read_heatmap_region(path)
+            if overwrite or not self.is_valid_png(path) or region is None or region['key'] != key:
+                pending.append((image, path))
+        metrics.increment('thumbnail_cache_hits', len(composites) - len(pending))
+
+        if not pending:
+            return
+
+        if session is None:
+            session = self.get_http_session(pool_size=max_workers)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self.download_composite_image, image, path, session, timeout)
+                       for image, path in pending]
+            for future, (_, path) in zip(futures, pending):
+                future.result()
+                write_heatmap_region(path, self.roi)
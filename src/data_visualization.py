@@ -1,26 +1,43 @@
+import os
 import pandas as pd
-import matplotlib.pyplot as plt
-import geemap.foliumap as geemap
-import plotly.graph_objs as go
 from datetime import datetime
-import ee
 
 from src.data_processing import DataProcessor
-
-plt.style.use('seaborn-v0_8-whitegrid')
+from src.maps import is_local_geometry, region_overlays, write_parcel_map
+from src.metrics import metrics
+from src.report import write_report
+from src.timelapse import write_timelapse
 
 class NDVIVisualization:
-    def __init__(self, df_data: pd.DataFrame, start_date, feature):
+    def __init__(self, df_data: pd.DataFrame, start_date, feature, output_dir='data/results'):
         self.df_data = df_data
         self.start_date = start_date
         self.feature = feature
-    def plot_timeseries(self):
-        """Geração de um gráfico de linha com motplotlib. Considera os valores médios do NDVI de todos os registros do período"""
-        self.df_data['date'] = pd.to_datetime(self.df_data['date'], format='%Y-%m-%d')
-        self.df_data['date'] = self.df_data['date'].dt.strftime('%d/%m/%Y')
+        self.output_dir = output_dir
+
+    @classmethod
+    def from_store(cls, store, start_date, feature, parcel_id, end_date=None, output_dir='data/results'):
+        """Cria a visualização lendo do NDVIStore apenas a parcela e o período necessários"""
+        df_data = store.read(
+            columns=['date', 'ndvi_mean', 'ndvi_max', 'ndvi_min', 'ndvi_median', 'ndvi_stdDev'],
+            parcels=[parcel_id],
+            start_date=start_date,
+            end_date=end_date,
+        )
+        return cls(df_data=df_data, start_date=start_date, feature=feature, output_dir=output_dir)
+
+    def build_timeseries_figure(self):
+        """Gráfico de linha (matplotlib) com os valores médios do NDVI de todos os registros do período"""
+        import matplotlib.pyplot as plt
+
+        plt.style.use('seaborn-v0_8-whitegrid')
 
-        plt.figure(figsize=(12, 6))
-        plt.plot(self.df_data['date'], self.df_data['ndvi_mean'], marker='o', linestyle='-', color='g', markersize=8, linewidth=2, label='NDVI Médio')
+        df_data = self.df_data.copy()
+        df_data['date'] = pd.to_datetime(df_data['date'], format='%Y-%m-%d')
+        df_data['date'] = df_data['date'].dt.strftime('%d/%m/%Y')
+
+        fig = plt.figure(figsize=(12, 6))
+        plt.plot(df_data['date'], df_data['ndvi_mean'], marker='o', linestyle='-', color='g', markersize=8, linewidth=2, label='NDVI Médio')
 
         plt.title('Evolução da Média de NDVI', fontsize=16, fontweight='bold')
         plt.xlabel('Data', fontsize=14)
@@ -35,15 +52,26 @@ class NDVIVisualization:
 
         plt.legend()
 
-        for i, row in self.df_data.iterrows():
+        for i, row in df_data.iterrows():
             plt.text(row['date'], row['ndvi_mean'] + 0.04, f'{row["ndvi_mean"]:.2f}', ha='center', fontsize=10)
 
         plt.tight_layout()
 
-        plt.savefig("data/results/temporal_ndvi_mean.png", format='png')
+        return fig
+
+    @metrics.timed()
+    def plot_timeseries(self):
+        """Geração de um gráfico de linha com motplotlib. Considera os valores médios do NDVI de todos os registros do período"""
+        import matplotlib.pyplot as plt
+
+        fig = self.build_timeseries_figure()
+        fig.savefig(os.path.join(self.output_dir, 'temporal_ndvi_mean.png'), format='png')
+        plt.close(fig)
+
+    def build_ndvi_figure(self):
+        """Figura plotly com os valores de Max, Min e Mediana de todos os registros do período"""
+        import plotly.graph_objs as go
 
-    def plot_ndvi_data(self):
-        """Gera um gráfico dinâmico com os valores de Max, Min e Mediana de todos os registros do período"""
         fig = go.Figure()
 
         df_data = pd.DataFrame()
@@ -119,10 +147,18 @@ class NDVIVisualization:
             template='plotly_white'
         )
 
-        fig.write_html("data/results/iterative_ndvi.html")
+        return fig
+
+    @metrics.timed()
+    def plot_ndvi_data(self):
+        """Gera um gráfico dinâmico com os valores de Max, Min e Mediana de todos os registros do período"""
+        fig = self.build_ndvi_figure()
+        fig.write_html(os.path.join(self.output_dir, 'iterative_ndvi.html'))
+
+    def build_histogram_figure(self):
+        """Figura plotly com o histograma de frequência dos valores médios de NDVI do período"""
+        import plotly.graph_objs as go
 
-    def plot_histograma_freq(self):
-        """Gera um histograma de frequência de todos os valores médios de NDVI registrados no período"""
         fig = go.Figure()
 
         fig.add_trace(go.Histogram(
@@ -140,16 +176,25 @@ class NDVIVisualization:
             template='plotly_white'
         )
 
-        fig.write_html("data/results/iterative_histogram.html")
+        return fig
 
-    def plot_boxplot(self):
-        """Gera um bozplot com os valores médios de NDVI registrados, agrupados por ano"""
-        self.df_data['date'] = pd.to_datetime(self.df_data['date'], dayfirst=True)
-        self.df_data['year'] = self.df_data['date'].dt.year
+    @metrics.timed()
+    def plot_histograma_freq(self):
+        """Gera um histograma de frequência de todos os valores médios de NDVI registrados no período"""
+        fig = self.build_histogram_figure()
+        fig.write_html(os.path.join(self.output_dir, 'iterative_histogram.html'))
+
+    def build_boxplot_figure(self):
+        """Figura plotly com o boxplot dos valores médios de NDVI, agrupados por ano"""
+        import plotly.graph_objs as go
+
+        df_data = self.df_data.copy()
+        df_data['date'] = pd.to_datetime(df_data['date'])
+        df_data['year'] = df_data['date'].dt.year
 
         boxplot = go.Box(
-            y=self.df_data['ndvi_mean'],
-            x=self.df_data['year'],
+            y=df_data['ndvi_mean'],
+            x=df_data['year'],
             name='NDVI',
             marker_color='green'
         )
@@ -163,18 +208,60 @@ class NDVIVisualization:
 
         fig = go.Figure(data=[boxplot], layout=layout)
 
-        fig.write_html("data/results/iterative_boxplot.html")
+        return fig
 
-    def plot_images_timelapse(self):
-        """Gera um timelapse com o heatmap da propriedade referente os valores de Mediana Mensal do NDVI"""
+    @metrics.timed()
+    def plot_boxplot(self):
+        """Gera um bozplot com os valores médios de NDVI registrados, agrupados por ano"""
+        fig = self.build_boxplot_figure()
+        fig.write_html(os.path.join(self.output_dir, 'iterative_boxplot.html'))
+
+    def build_figures(self):
+        """Gráficos interativos (plotly) da parcela, indexados pelo nome usado no relatório"""
+        return {
+            'ndvi': self.build_ndvi_figure(),
+            'histogram': self.build_histogram_figure(),
+            'boxplot': self.build_boxplot_figure(),
+        }
+
+    @metrics.timed()
+    def plot_report(self, parcel_id='ndvi', inline_data=True):
+        """Gera o relatório com os gráficos interativos em uma única página e um único plotly.js,
+        no lugar de um HTML autocontido por gráfico"""
+        return write_report({parcel_id: self.build_figures()}, os.path.join(self.output_dir, 'report'),
+                            inline_data=inline_data)
+
+    def get_timelapse_frames(self):
+        """Caminhos dos heatmaps mensais do período e os rótulos (mm/aaaa) de cada quadro"""
         start_date = datetime.strptime(self.start_date, '%Y-%m-%d')
         dates_months = list(pd.date_range(start=start_date, periods=12, freq='1M'))
 
         images_path = [f"data/results/ndvi_{date.strftime('%Y%m')}.png" for date in dates_months]
         date = [f"{date.strftime('%m/%Y')}" for date in dates_months]
 
-        self.df_data = pd.DataFrame({'images_path': images_path, 'date': date})
-        self.df_data['image_base64'] = self.df_data['images_path'].apply(DataProcessor.encode_image)
+        return images_path, date
+
+    @metrics.timed()
+    def plot_images_timelapse_assets(self, images_path=None, labels=None, output_dir=None, image_format='webp'):
+        """Gera o timelapse com quadros comprimidos (WebP ou PNG com paleta) em arquivos separados,
+        carregados sob demanda pelo slider. Por padrão usa os heatmaps mensais do período, mas aceita
+        qualquer lista de quadros (ex.: semanais de vários anos)."""
+        if images_path is None:
+            images_path, labels = self.get_timelapse_frames()
+        if output_dir is None:
+            output_dir = os.path.join(self.output_dir, 'timelapse')
+
+        return write_timelapse(images_path, labels, output_dir, image_format)
+
+    @metrics.timed()
+    def plot_images_timelapse(self):
+        """Gera um timelapse com o heatmap da propriedade referente os valores de Mediana Mensal do NDVI"""
+        import plotly.graph_objs as go
+
+        images_path, date = self.get_timelapse_frames()
+
+        df_frames = pd.DataFrame({'images_path': images_path, 'date': date})
+        df_frames['image_base64'] = df_frames['images_path'].apply(DataProcessor.encode_image)
 
         frames = [
             go.Frame(
@@ -183,7 +270,7 @@ class NDVIVisualization:
                 ],
                 name=str(row['date'])
             )
-            for _, row in self.df_data.iterrows()
+            for _, row in df_frames.iterrows()
         ]
 
         layout = go.Layout(
@@ -240,7 +327,7 @@ class NDVIVisualization:
                         'label': str(month),
                         'method': 'animate'
                     }
-                    for month in self.df_data['date']
+                    for month in df_frames['date']
                 ]
             }]
         )
@@ -248,7 +335,7 @@ class NDVIVisualization:
 
         fig = go.Figure(
             data=[
-                go.Image(source=f"data:image/png;base64,{self.df_data.iloc[1]['image_base64']}"),
+                go.Image(source=f"data:image/png;base64,{df_frames.iloc[1]['image_base64']}"),
                 go.Heatmap(
                     z=[[0, 1], [0, 1]],
                     colorscale= [
@@ -280,10 +367,25 @@ class NDVIVisualization:
         fig.update_yaxes(visible=False, scaleanchor='y', scaleratio=1)
         fig.update_xaxes(visible=False)
 
-        fig.write_html("data/results/images_slider.html")
+        fig.write_html(os.path.join(self.output_dir, 'images_slider.html'))
 
+    @metrics.timed()
     def plot_mapdisplay(self):
-        """Gera um mapa dinâmico mostrando a área da propriedade"""
+        """Gera um mapa dinâmico mostrando a área da propriedade.
+
+        Se a feature for uma geometria local (shapely, ou uma série de geometrias por parcela) o mapa é
+        desenhado sem o Earth Engine (src/maps.py), com os heatmaps mensais como camadas apenas quando
+        foram gerados sobre essas mesmas geometrias; com uma ee.Feature o mapa é montado pelo geemap.
+        """
+        path = os.path.join(self.output_dir, 'map.html')
+        if is_local_geometry(self.feature):
+            overlays, bounds = region_overlays(zip(*self.get_timelapse_frames()), self.feature)
+            write_parcel_map(self.feature, path, overlays, bounds)
+            return
+
+        import ee
+        import geemap.foliumap as geemap
+
         m = geemap.Map()
         m.add_basemap('SATELLITE')
 
@@ -299,4 +401,4 @@ class NDVIVisualization:
         m.addLayer(styled_polygon, {}, 'Fazenda Batista')
 
         m.centerObject(self.feature, zoom=15)
-        m.to_html(filename='data/results/map.html')
\ No newline at end of file
+        m.to_html(filename=path)
\ No newline at end of file
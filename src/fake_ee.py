@@ -0,0 +1,566 @@
+"""Earth Engine falso, local e determinístico, para benchmarks e execuções sem rede.
+
+Implementa o subconjunto da API do ``ee`` usado pelo DataProcessor (coleções, filtros, bandas,
+reducers, features e thumbnails) sobre cenas sintéticas do Sentinel-2. As operações são calculadas
+localmente com NumPy; só getInfo e getThumbURL contam como idas ao servidor, e cada uma delas
+espera ``latency`` segundos e soma o tamanho da resposta em ``bytes_transferred``.
+
+Uso:
+    fake = FakeEarthEngine(n_scenes=73, latency=0.05)
+    processor = DataProcessor('data/raw/batista.shp', '2023-01-01', ee_client=fake)
+    processor.get_all_data(use_cache=False)
+    fake.round_trips, fake.bytes_transferred
+"""
+import json
+import math
+import threading
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+JAVA_DATE_FORMATS = {'yyyy': '%Y', 'MM': '%m', 'dd': '%d', 'HH': '%H', 'mm': '%M', 'ss': '%S'}
+
+
+def _to_timestamp(value):
+    if isinstance(value, FakeDate):
+        return value.timestamp
+    return pd.Timestamp(value)
+
+
+def _bounds(coordinates):
+    """Retângulo envolvente (min_x, min_y, max_x, max_y) de coordenadas GeoJSON aninhadas"""
+    points = np.asarray(list(_points(coordinates)), dtype=float)
+    return points[:, 0].min(), points[:, 1].min(), points[:, 0].max(), points[:, 1].max()
+
+
+def _points(coordinates):
+    if len(coordinates) and isinstance(coordinates[0], (int, float, np.number)):
+        yield coordinates[:2]
+        return
+    for item in coordinates:
+        yield from _points(item)
+
+
+def _geometry_mask(geometry, shape):
+    """Subconjunto fixo dos pixels da cena coberto por uma geometria; parcelas diferentes têm
+    estatísticas (e computações) diferentes"""
+    if not isinstance(geometry, FakeGeometry):
+        return None
+    seed = zlib.crc32(json.dumps(geometry.coordinates).encode())
+    mask = np.random.default_rng(seed).random(shape) < 0.75
+    mask.flat[seed % mask.size] = True
+    return mask
+
+
+def _resolve(value):
+    """Converte um objeto do fake na estrutura JSON que o getInfo do Earth Engine devolveria"""
+    # Caminho rápido para os escalares, a maioria dos valores (ex.: os pares dos histogramas)
+    value_type = type(value)
+    if value_type is float:
+        return value if math.isfinite(value) else None
+    if value_type in (int, str, bool) or value is None:
+        return value
+    if isinstance(value, FakeObject):
+        return value.resolved()
+    if isinstance(value, dict):
+        return {k: _resolve(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_resolve(v) for v in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    return value
+
+
+class FakeObject:
+    """Base dos objetos do fake; getInfo é a única operação que conta como ida ao servidor.
+
+    Os objetos são imutáveis (toda operação cria um objeto novo), então a resposta do getInfo e a
+    serialização são calculadas uma única vez por objeto: a chave de coalescência do agendador e o
+    getInfo seguinte reaproveitam o mesmo resultado em vez de recalculá-lo.
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self._resolved = None
+        self._serialized = None
+
+    def info(self):
+        raise NotImplementedError
+
+    def resolved(self):
+        if self._resolved is None:
+            self._resolved = self.info()
+        return self._resolved
+
+    def getInfo(self):
+        return self._client.round_trip(self.resolved)
+
+    def serialize(self):
+        """Equivalente ao grafo serializado do ee: objetos com o mesmo conteúdo geram a mesma string"""
+        if self._serialized is None:
+            self._serialized = self._serialize()
+        return self._serialized
+
+    def _serialize(self):
+        return json.dumps(self.resolved(), sort_keys=True, default=str)
+
+
+class FakeValue(FakeObject):
+    def __init__(self, client, value):
+        super().__init__(client)
+        self.value = value
+
+    def info(self):
+        return _resolve(self.value)
+
+
+class FakeDate(FakeObject):
+    def __init__(self, client, timestamp):
+        super().__init__(client)
+        self.timestamp = pd.Timestamp(timestamp)
+
+    def format(self, fmt):
+        for java, python in JAVA_DATE_FORMATS.items():
+            fmt = fmt.replace(java, python)
+        return FakeValue(self._client, self.timestamp.strftime(fmt))
+
+    def millis(self):
+        return FakeValue(self._client, int(self.timestamp.value // 1_000_000))
+
+    def info(self):
+        return {'type': 'Date', 'value': int(self.timestamp.value // 1_000_000)}
+
+
+class FakeDictionary(FakeObject):
+    def __init__(self, client, values):
+        super().__init__(client)
+        self.values = values
+
+    def get(self, key):
+        return FakeValue(self._client, self.values.get(key))
+
+    def info(self):
+        return _resolve(self.values)
+
+
+class FakeList(FakeObject):
+    def __init__(self, client, items):
+        super().__init__(client)
+        self.items = list(items)
+
+    def get(self, index):
+        return self.items[_resolve(index)]
+
+    def size(self):
+        return FakeValue(self._client, len(self.items))
+
+    def distinct(self):
+        seen = {}
+        for item in self.items:
+            seen.setdefault(json.dumps(_resolve(item), sort_keys=True, default=str), item)
+        return FakeList(self._client, seen.values())
+
+    def map(self, function):
+        return FakeList(self._client, [function(item) for item in self.items])
+
+    def info(self):
+        return _resolve(self.items)
+
+
+class FakeGeometry(FakeObject):
+    def __init__(self, client, geometry_type, coordinates):
+        super().__init__(client)
+        self.type = geometry_type
+        self.coordinates = coordinates
+
+    def bounds(self):
+        return _bounds(self.coordinates)
+
+    def dissolve(self, maxError=None):
+        """União das partes da geometria (com shapely, como o servidor faria)"""
+        from shapely.geometry import mapping, shape
+
+        dissolved = mapping(shape({'type': self.type, 'coordinates': self.coordinates}).buffer(0))
+        return FakeGeometry(self._client, dissolved['type'], json.loads(json.dumps(dissolved['coordinates'])))
+
+    def info(self):
+        return {'type': self.type, 'coordinates': self.coordinates}
+
+
+class FakeFilter:
+    def __init__(self, predicate):
+        self.predicate = predicate
+
+
+class FakeReducer:
+    """Reducer (ou combinação de reducers) aplicado aos pixels de cada banda"""
+
+    FUNCTIONS = {
+        'mean': np.mean,
+        'min': np.min,
+        'max': np.max,
+        'stdDev': np.std,
+        'median': np.median,
+    }
+
+    def __init__(self, outputs):
+        self.outputs = outputs
+
+    def combine(self, reducer2, sharedInputs=True):
+        return FakeReducer(self.outputs + reducer2.outputs)
+
+    def unweighted(self):
+        return self
+
+    @staticmethod
+    def fixed_histogram(values, low, high, steps):
+        """Saída do fixedHistogram: [[início do bin, contagem], ...]"""
+        counts, edges = np.histogram(values, bins=steps, range=(low, high))
+        return [[float(start), int(count)] for start, count in zip(edges[:-1], counts)]
+
+    def reduce(self, band, values, prefix=True):
+        """Como no Earth Engine: reduceRegion prefixa o nome da banda; reduceRegions de uma imagem com
+        uma banda só usa o nome das saídas"""
+        values = values[np.isfinite(values)]
+        result = {}
+        for name, function in self.outputs:
+            if not prefix:
+                key = name
+            else:
+                key = band if len(self.outputs) == 1 else f'{band}_{name}'
+            if not values.size:
+                result[key] = None
+            else:
+                value = function(values)
+                result[key] = value if isinstance(value, list) else float(value)
+        return result
+
+
+class FakeImage(FakeObject):
+    def __init__(self, client, bands, properties=None):
+        super().__init__(client)
+        self.bands = bands
+        self.properties = properties or {}
+
+    def _single(self):
+        return next(iter(self.bands.items()))
+
+    def _binary(self, other, operation):
+        name, values = self._single()
+        other_values = other._single()[1] if isinstance(other, FakeImage) else other
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return FakeImage(self._client, {name: operation(values, other_values)}, self.properties)
+
+    def select(self, *names):
+        if len(names) == 1 and isinstance(names[0], (list, tuple)):
+            names = names[0]
+        return FakeImage(self._client, {n: self.bands[n] for n in names if n in self.bands}, self.properties)
+
+    def add(self, other):
+        return self._binary(other, np.add)
+
+    def subtract(self, other):
+        return self._binary(other, np.subtract)
+
+    def divide(self, other):
+        return self._binary(other, np.divide)
+
+    def multiply(self, other):
+        return self._binary(other, np.multiply)
+
+    def expression(self, expression, variables):
+        """Avalia a expressão com numpy sobre as bandas únicas das variáveis"""
+        namespace = {name: image._single()[1] for name, image in variables.items()}
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = eval(expression, {'__builtins__': {}}, namespace)
+        return FakeImage(self._client, {'constant': values}, self.properties)
+
+    def rename(self, name):
+        _, values = self._single()
+        return FakeImage(self._client, {name: values}, self.properties)
+
+    def addBands(self, other):
+        return FakeImage(self._client, {**self.bands, **other.bands}, self.properties)
+
+    def clip(self, geometry):
+        return self
+
+    def set(self, key, value):
+        return FakeImage(self._client, self.bands, {**self.properties, key: value})
+
+    def get(self, key):
+        return FakeValue(self._client, self.properties.get(key))
+
+    def date(self):
+        return FakeDate(self._client, pd.Timestamp(self.properties['system:time_start'], unit='ms'))
+
+    def _reduce(self, reducer, geometry, prefix=True):
+        result = {}
+        if not self.bands:
+            return result
+        mask = _geometry_mask(geometry, next(iter(self.bands.values())).shape)
+        for band, values in self.bands.items():
+            result.update(reducer.reduce(band, values[mask] if mask is not None else values.ravel(), prefix))
+        return result
+
+    def reduceRegion(self, reducer, geometry=None, scale=None, maxPixels=None):
+        return FakeDictionary(self._client, self._reduce(reducer, geometry))
+
+    def reduceRegions(self, collection, reducer, scale=None):
+        prefix = len(self.bands) > 1
+        return FakeCollection(self._client, [
+            FakeFeature(self._client, feature.geometry,
+                        {**feature.properties, **self._reduce(reducer, feature.geometry, prefix)})
+            for feature in collection.items
+        ])
+
+    def geometry(self):
+        return FakeGeometry(self._client, 'Polygon', [self.properties['system:footprint']])
+
+    def _serialize(self):
+        digest = zlib.crc32(b''.join(values.tobytes() for values in self.bands.values()))
+        return json.dumps([super()._serialize(), list(self.bands), digest])
+
+    def getThumbURL(self, params):
+        key = zlib.crc32(json.dumps(_resolve(self.properties), sort_keys=True, default=str).encode())
+        url = f'{self._client.thumb_base_url}/thumb/{key:08x}.png'
+        return self._client.round_trip(lambda: url)
+
+    def info(self):
+        return {'type': 'Image', 'bands': [{'id': name} for name in self.bands],
+                'properties': _resolve(self.properties)}
+
+
+class FakeFeature(FakeObject):
+    def __init__(self, client, geometry, properties=None):
+        super().__init__(client)
+        self.geometry = geometry
+        self.properties = properties or {}
+
+    def set(self, key, value):
+        return FakeFeature(self._client, self.geometry, {**self.properties, key: value})
+
+    def get(self, key):
+        return FakeValue(self._client, self.properties.get(key))
+
+    def toDictionary(self):
+        return FakeDictionary(self._client, dict(self.properties))
+
+    def info(self):
+        return {'type': 'Feature', 'geometry': _resolve(self.geometry), 'properties': _resolve(self.properties)}
+
+
+class FakeCollection(FakeObject):
+    """ImageCollection/FeatureCollection: uma lista de elementos com filtros e map locais"""
+
+    def __init__(self, client, items):
+        super().__init__(client)
+        self.items = list(items)
+
+    def _new(self, items):
+        return type(self)(self._client, items)
+
+    def filterBounds(self, geometry):
+        if not isinstance(geometry, FakeGeometry):
+            return self._new(self.items)
+        min_x, min_y, max_x, max_y = geometry.bounds()
+
+        def intersects(item):
+            footprint = item.properties.get('system:footprint')
+            if footprint is None:
+                return True
+            f_min_x, f_min_y, f_max_x, f_max_y = _bounds(footprint)
+            return f_min_x <= max_x and min_x <= f_max_x and f_min_y <= max_y and min_y <= f_max_y
+
+        return self._new([item for item in self.items if intersects(item)])
+
+    def filter(self, fake_filter):
+        return self._new([item for item in self.items if fake_filter.predicate(item.properties)])
+
+    def filterDate(self, start, end):
+        start = int(_to_timestamp(start).value // 1_000_000)
+        end = int(_to_timestamp(end).value // 1_000_000)
+        return self._new([item for item in self.items if start <= item.properties['system:time_start'] < end])
+
+    def map(self, function):
+        return self._new([function(item) for item in self.items])
+
+    def select(self, *names):
+        return self._new([item.select(*names) for item in self.items])
+
+    def flatten(self):
+        return self._new([feature for collection in self.items for feature in collection.items])
+
+    def size(self):
+        return FakeValue(self._client, len(self.items))
+
+    def aggregate_array(self, name):
+        return FakeList(self._client, [item.properties.get(name) for item in self.items])
+
+    def geometry(self, maxError=None):
+        """Footprints de todos os elementos como um MultiPolygon, sem unir as partes (como no ee)"""
+        return FakeGeometry(self._client, 'MultiPolygon', [[item.properties['system:footprint']]
+                                                           for item in self.items])
+
+    def toList(self, count):
+        return FakeList(self._client, self.items[:_resolve(count)])
+
+    def median(self):
+        if not self.items:
+            return FakeImage(self._client, {})
+        names = list(self.items[0].bands)
+        return FakeImage(self._client, {
+            name: np.nanmedian(np.stack([item.bands[name] for item in self.items]), axis=0) for name in names
+        })
+
+    def _serialize(self):
+        return json.dumps([item.serialize() for item in self.items])
+
+    def info(self):
+        return {'type': 'FeatureCollection', 'features': [_resolve(item) for item in self.items]}
+
+
+class FakeEarthEngine:
+    """Cliente falso do Earth Engine, injetável no DataProcessor pelo argumento ee_client.
+
+    As cenas sintéticas cobrem n_scenes datas a cada step_days dias a partir de start_date, com
+    nuvens aleatórias e bandas B2, B3, B4, B5 e B8 de image_size x image_size pixels, em cada um dos tiles
+    ({MGRS_TILE: (min_x, min_y, max_x, max_y)}; por padrão um único tile cobrindo o mundo todo).
+    ``latency`` é o tempo simulado de cada ida ao servidor (getInfo ou getThumbURL).
+    """
+
+    def __init__(self, n_scenes=73, start_date='2023-01-01', step_days=5, image_size=8, latency=0.0,
+                 thumb_base_url='http://fake-ee.invalid', tiles=None, seed=0):
+        self.latency = latency
+        self.thumb_base_url = thumb_base_url
+        self.round_trips = 0
+        self.bytes_transferred = 0
+        self._lock = threading.Lock()
+        self.tiles = tiles if tiles is not None else {'23KMS': (-180, -90, 180, 90)}
+        self.scenes = self._make_scenes(n_scenes, start_date, step_days, image_size, seed)
+
+        client = self
+
+        class Geometry:
+            @staticmethod
+            def Polygon(coords):
+                return FakeGeometry(client, 'Polygon', coords)
+
+            @staticmethod
+            def MultiPolygon(coords):
+                return FakeGeometry(client, 'MultiPolygon', coords)
+
+            @staticmethod
+            def Rectangle(coords):
+                min_x, min_y, max_x, max_y = coords
+                return FakeGeometry(client, 'Polygon', [[[min_x, min_y], [max_x, min_y], [max_x, max_y],
+                                                         [min_x, max_y], [min_x, min_y]]])
+
+        class Filter:
+            @staticmethod
+            def lt(name, value):
+                return FakeFilter(lambda properties: properties.get(name) is not None and properties[name] < value)
+
+            @staticmethod
+            def eq(name, value):
+                return FakeFilter(lambda properties: properties.get(name) == value)
+
+        class Reducer:
+            @staticmethod
+            def mean():
+                return FakeReducer([('mean', FakeReducer.FUNCTIONS['mean'])])
+
+            @staticmethod
+            def min():
+                return FakeReducer([('min', FakeReducer.FUNCTIONS['min'])])
+
+            @staticmethod
+            def max():
+                return FakeReducer([('max', FakeReducer.FUNCTIONS['max'])])
+
+            @staticmethod
+            def stdDev():
+                return FakeReducer([('stdDev', FakeReducer.FUNCTIONS['stdDev'])])
+
+            @staticmethod
+            def median():
+                return FakeReducer([('median', FakeReducer.FUNCTIONS['median'])])
+
+            @staticmethod
+            def fixedHistogram(min, max, steps):
+                return FakeReducer([('histogram', lambda values: FakeReducer.fixed_histogram(values, min, max, steps))])
+
+        self.Geometry = Geometry
+        self.Filter = Filter
+        self.Reducer = Reducer
+
+    def _make_scenes(self, n_scenes, start_date, step_days, image_size, seed):
+        rng = np.random.default_rng(seed)
+        scenes = []
+        for i, date in enumerate(pd.date_range(start_date, periods=n_scenes, freq=f'{step_days}D')):
+            season = 0.5 + 0.4 * np.sin(2 * np.pi * i / max(n_scenes, 1))
+            for tile, (min_x, min_y, max_x, max_y) in sorted(self.tiles.items()):
+                shape = (image_size, image_size)
+                b4 = rng.uniform(300, 1200, shape)
+                b8 = b4 * (1 + season) / (1 - season * 0.9) * rng.uniform(0.9, 1.1, shape)
+                bands = {
+                    'B2': b4 * rng.uniform(0.6, 0.9, shape),
+                    'B3': b4 * rng.uniform(0.8, 1.1, shape),
+                    'B4': b4,
+                    'B5': (b4 + b8) / 2 * rng.uniform(0.9, 1.1, shape),
+                    'B8': b8,
+                }
+                scenes.append((bands, {
+                    'system:index': f'{date:%Y%m%d}T132241_{date:%Y%m%d}T132236_T{tile}',
+                    'system:time_start': int(date.value // 1_000_000),
+                    'system:footprint': [[min_x, min_y], [max_x, min_y], [max_x, max_y], [min_x, max_y],
+                                         [min_x, min_y]],
+                    'CLOUDY_PIXEL_PERCENTAGE': float(rng.uniform(0, 60)),
+                    'MGRS_TILE': tile,
+                }))
+        return scenes
+
+    def round_trip(self, compute):
+        """Simula uma ida ao servidor: espera a latência e contabiliza a resposta. A resposta é
+        decodificada do JSON, como no cliente real, então quem a recebe não altera o resultado guardado
+        no objeto"""
+        payload = json.dumps(compute(), default=str)
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.round_trips += 1
+            self.bytes_transferred += len(payload.encode())
+        return json.loads(payload)
+
+    def reset_counters(self):
+        with self._lock:
+            self.round_trips = 0
+            self.bytes_transferred = 0
+
+    def Initialize(self, *args, **kwargs):
+        return None
+
+    def ImageCollection(self, source):
+        if isinstance(source, FakeCollection):
+            return FakeCollection(self, source.items)
+        if isinstance(source, (list, tuple)):
+            return FakeCollection(self, source)
+        return FakeCollection(self, [FakeImage(self, dict(bands), dict(properties))
+                                     for bands, properties in self.scenes])
+
+    def Image(self, image):
+        return image
+
+    def Feature(self, geometry, properties=None):
+        if isinstance(properties, FakeDictionary):
+            properties = properties.values
+        return FakeFeature(self, geometry, dict(properties or {}))
+
+    def FeatureCollection(self, features):
+        if isinstance(features, (FakeCollection, FakeList)):
+            return FakeCollection(self, features.items)
+        return FakeCollection(self, features)
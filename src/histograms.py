@@ -0,0 +1,86 @@
+"""Histogramas de pixels de NDVI por cena e as análises derivadas deles sem novas chamadas remotas.
+
+Cada cena guarda a contagem de pixels em HISTOGRAM_BINS bins fixos sobre HISTOGRAM_RANGE (100 bins de
+largura 0.02 sobre [-1, 1]), um vetor de inteiros. Somar histogramas junta cenas ou parcelas; quantis
+e áreas acima de um limiar saem da contagem acumulada, com erro máximo de uma largura de bin.
+
+As funções aceitam um histograma (1D) ou uma matriz com um histograma por linha (2D) e devolvem um
+valor por linha, então uma série inteira é processada de uma vez.
+"""
+import numpy as np
+
+HISTOGRAM_BINS = 100
+HISTOGRAM_RANGE = (-1.0, 1.0)
+
+
+def counts_from_pairs(pairs):
+    """Contagens a partir da saída do ee.Reducer.fixedHistogram ([[início do bin, contagem], ...])"""
+    if not pairs:
+        return None
+    return [int(round(count)) for _, count in pairs]
+
+
+def rebin(histogram, bins=HISTOGRAM_BINS):
+    """Reduz um histograma de bins fixos para bins (divisor do número de bins original)"""
+    histogram = np.asarray(histogram)
+    if histogram.shape[-1] % bins:
+        raise ValueError(f'{histogram.shape[-1]} bins não podem ser agrupados em {bins}')
+    return histogram.reshape(*histogram.shape[:-1], bins, -1).sum(axis=-1)
+
+
+def histogram_matrix(histograms, bins=HISTOGRAM_BINS):
+    """Empilha uma sequência de histogramas (ex.: a coluna ndvi_histogram) numa matriz; cenas sem
+    histograma viram linhas de zeros"""
+    matrix = np.zeros((len(histograms), bins), dtype=np.int64)
+    for i, histogram in enumerate(histograms):
+        if histogram is not None and len(histogram):
+            matrix[i] = histogram
+    return matrix
+
+
+def bin_edges(bins=HISTOGRAM_BINS, value_range=HISTOGRAM_RANGE):
+    return np.linspace(value_range[0], value_range[1], bins + 1)
+
+
+def histogram_quantile(histograms, q, value_range=HISTOGRAM_RANGE):
+    """Quantil q de cada histograma, com interpolação linear dentro do bin (NaN sem pixels)"""
+    single = np.ndim(histograms) == 1
+    histograms = np.atleast_2d(np.asarray(histograms, dtype=np.float64))
+    low, high = value_range
+    width = (high - low) / histograms.shape[1]
+
+    cumulative = np.cumsum(histograms, axis=1)
+    total = cumulative[:, -1]
+    target = q * total
+    index = np.minimum((cumulative < target[:, None]).sum(axis=1), histograms.shape[1] - 1)
+
+    rows = np.arange(histograms.shape[0])
+    before = np.where(index > 0, cumulative[rows, np.maximum(index - 1, 0)], 0)
+    in_bin = histograms[rows, index]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fraction = np.where(in_bin > 0, (target - before) / in_bin, 0.5)
+
+    result = np.where(total > 0, low + (index + fraction) * width, np.nan)
+    return float(result[0]) if single else result
+
+
+def fraction_above(histograms, threshold, value_range=HISTOGRAM_RANGE):
+    """Fração dos pixels com valor acima do limiar; o bin que contém o limiar é dividido linearmente"""
+    single = np.ndim(histograms) == 1
+    histograms = np.atleast_2d(np.asarray(histograms, dtype=np.float64))
+    edges = bin_edges(histograms.shape[1], value_range)
+    overlap = np.clip((edges[1:] - threshold) / (edges[1:] - edges[:-1]), 0, 1)
+
+    total = histograms.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        result = np.where(total > 0, (histograms * overlap).sum(axis=1) / total, np.nan)
+    return float(result[0]) if single else result
+
+
+def area_above(histograms, threshold, scale=10, value_range=HISTOGRAM_RANGE):
+    """Área (ha) dos pixels acima do limiar, com cada pixel valendo scale x scale metros"""
+    single = np.ndim(histograms) == 1
+    histograms = np.atleast_2d(np.asarray(histograms, dtype=np.float64))
+    fraction = np.nan_to_num(fraction_above(histograms, threshold, value_range))
+    area = fraction * histograms.sum(axis=1) * scale ** 2 / 1e4
+    return float(area[0]) if single else area
@@ -0,0 +1,63 @@
+"""Registro dos índices espectrais calculados sobre as cenas do Sentinel-2.
+
+Cada índice é uma expressão do Earth Engine (ee.Image.expression) sobre variáveis ligadas a bandas do
+Sentinel-2 em reflectância (valor / 10000). Todos os índices pedidos viram bandas de uma única função
+mapeada sobre a coleção e são reduzidos juntos pelo reducer combinado, então o número de chamadas
+cresce com o número de cenas e não com cenas x índices.
+
+Novos índices podem ser registrados com register_index('GNDVI', '(NIR - GREEN) / (NIR + GREEN)',
+{'NIR': 'B8', 'GREEN': 'B3'}).
+"""
+import pandas as pd
+
+# Ordem das estatísticas nas colunas de saída (ndvi_mean, ndvi_max, ...), a mesma do STATS_COLUMNS
+STATISTICS = ('mean', 'max', 'min', 'median', 'stdDev')
+REFLECTANCE_SCALE = 10000
+
+INDICES = {
+    'NDVI': ('(NIR - RED) / (NIR + RED)', {'NIR': 'B8', 'RED': 'B4'}),
+    'EVI': ('2.5 * (NIR - RED) / (NIR + 6 * RED - 7.5 * BLUE + 1)', {'NIR': 'B8', 'RED': 'B4', 'BLUE': 'B2'}),
+    # NDWI de McFeeters (água superficial); para umidade da vegetação registre (NIR - SWIR) / (NIR + SWIR)
+    'NDWI': ('(GREEN - NIR) / (GREEN + NIR)', {'GREEN': 'B3', 'NIR': 'B8'}),
+    'SAVI': ('1.5 * (NIR - RED) / (NIR + RED + 0.5)', {'NIR': 'B8', 'RED': 'B4'}),
+    'NDRE': ('(NIR - RED_EDGE) / (NIR + RED_EDGE)', {'NIR': 'B8', 'RED_EDGE': 'B5'}),
+}
+
+
+def register_index(name, expression, bands):
+    """Registra (ou substitui) um índice: expressão e {variável: banda do Sentinel-2}"""
+    INDICES[name] = (expression, dict(bands))
+
+
+def validate_indices(indices):
+    unknown = [name for name in indices if name not in INDICES]
+    if unknown:
+        raise ValueError(f'Índices não registrados: {unknown}; disponíveis: {sorted(INDICES)}')
+    return tuple(indices)
+
+
+def add_index_bands(image, indices):
+    """Acrescenta à imagem uma banda por índice, todas na mesma função mapeada"""
+    for name in indices:
+        expression, bands = INDICES[name]
+        variables = {variable: image.select(band).divide(REFLECTANCE_SCALE) for variable, band in bands.items()}
+        image = image.addBands(image.expression(expression, variables).rename(name))
+    return image
+
+
+def stats_columns(indices):
+    """Colunas de estatísticas da tabela larga: <índice>_<estatística>, como ndvi_mean"""
+    return [f'{name.lower()}_{statistic}' for name in indices for statistic in STATISTICS]
+
+
+def stats_to_long(df, indices):
+    """Converte a tabela larga (uma coluna por índice e estatística) para o formato longo: uma linha por
+    data (e parcela) e índice, com as colunas mean, max, min, median e stdDev"""
+    id_columns = [c for c in ('parcel_id', 'date', 'scene_id') if c in df.columns]
+    frames = []
+    for name in indices:
+        columns = {f'{name.lower()}_{statistic}': statistic for statistic in STATISTICS}
+        frame = df[id_columns + list(columns)].rename(columns=columns)
+        frame.insert(len(id_columns), 'index', name)
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True).sort_values(id_columns + ['index'], ignore_index=True)
@@ -0,0 +1,200 @@
+"""Mapas interativos (folium) desenhados localmente, sem sessão do Earth Engine.
+
+Os contornos das parcelas vêm direto das geometrias do shapefile e os heatmaps de NDVI já baixados
+(data/results/ndvi_YYYYMM.png) entram como camadas de imagem sobre o retângulo envolvente da região,
+o mesmo usado no getThumbURL. Cada heatmap tem ao lado um ndvi_YYYYMM.json com a região sobre a qual
+foi gerado (hash das geometrias e retângulo envolvente); um mapa só recebe os heatmaps das suas próprias
+geometrias, e não os de outra fazenda esticados sobre elas. Os heatmaps são convertidos em quadros
+comprimidos (src/timelapse.py) em map_frames/, ao lado do HTML, e referenciados por URL relativa em vez
+de embutidos em base64. Centro e zoom são calculados em Web Mercator para o retângulo caber na janela do
+mapa.
+
+Para manter o HTML pequeno com milhares de parcelas, as geometrias são simplificadas com tolerância de
+um quarto de pixel no zoom inicial (a diferença só aparece depois de aproximar dois níveis) e as
+coordenadas arredondadas na mesma grade; acima de max_polygons parcelas, cada uma vira um ponto em um
+cluster de marcadores.
+"""
+import hashlib
+import json
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+TILE_SIZE = 256
+MAX_ZOOM = 18
+# Níveis de zoom além do inicial em que a simplificação ainda fica abaixo de um pixel
+DETAIL_ZOOM_LEVELS = 2
+BASEMAPS = {
+    'satellite': ('https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}',
+                  'Esri World Imagery'),
+    'osm': ('https://tile.openstreetmap.org/{z}/{x}/{y}.png', 'OpenStreetMap'),
+}
+
+
+def is_local_geometry(feature):
+    """Verifica se a feature é uma geometria shapely ou uma série de geometrias (e não um objeto do ee)"""
+    from shapely.geometry.base import BaseGeometry
+
+    return isinstance(feature, (BaseGeometry, pd.Series))
+
+
+def as_geoseries(geometries):
+    """Série de geometrias indexada pelo ID da parcela; uma geometria solta vira uma série de um item"""
+    if isinstance(geometries, pd.Series):
+        return geometries
+    return pd.Series([geometries], index=['parcela'])
+
+
+def region_key(geometries):
+    """Hash das geometrias (sem os IDs): uma geometria solta e uma série só com ela têm a mesma chave"""
+    digest = hashlib.sha1()
+    for geom in as_geoseries(geometries):
+        digest.update(geom.wkb)
+    return digest.hexdigest()
+
+
+def heatmap_region_path(image_path):
+    return f'{os.path.splitext(image_path)[0]}.json'
+
+
+def write_heatmap_region(image_path, geometries):
+    """Grava ao lado do heatmap a região sobre a qual ele foi gerado"""
+    import shapely
+
+    bounds = shapely.total_bounds(np.asarray(as_geoseries(geometries), dtype=object))
+    region = {'key': region_key(geometries), 'bounds': [float(v) for v in bounds]}
+    with open(heatmap_region_path(image_path), 'w') as f:
+        json.dump(region, f)
+
+
+def read_heatmap_region(image_path):
+    """Região gravada ao lado do heatmap, ou None se não houver (heatmaps antigos)"""
+    try:
+        with open(heatmap_region_path(image_path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def region_overlays(frames, geometries):
+    """Filtra os quadros (caminho do PNG, rótulo) pelos heatmaps gerados sobre essas mesmas geometrias.
+
+    Retorna (overlays, retângulo onde posicioná-los); heatmaps sem região gravada ou de outra região
+    ficam de fora, e sem nenhum heatmap da região o retângulo é None.
+    """
+    key = region_key(geometries)
+    overlays = []
+    bounds = None
+    for image_path, label in frames:
+        region = read_heatmap_region(image_path)
+        if os.path.exists(image_path) and region is not None and region['key'] == key:
+            overlays.append((image_path, label))
+            bounds = tuple(region['bounds'])
+    return overlays, bounds
+
+
+def mercator_y(latitude):
+    return math.log(math.tan(math.pi / 4 + math.radians(latitude) / 2))
+
+
+def map_view(bounds, width=1024, height=768, max_zoom=MAX_ZOOM):
+    """Centro [lat, lon] e maior zoom inteiro em que o retângulo (minx, miny, maxx, maxy) cabe na janela"""
+    minx, miny, maxx, maxy = bounds
+    y_min, y_max = mercator_y(miny), mercator_y(maxy)
+    center = [math.degrees(math.atan(math.sinh((y_min + y_max) / 2))), (minx + maxx) / 2]
+
+    # Fração do mundo ocupada pelo retângulo em cada eixo; com largura ou altura zero (ponto) vale max_zoom
+    x_fraction = (maxx - minx) / 360
+    y_fraction = (y_max - y_min) / (2 * math.pi)
+    zooms = [max_zoom]
+    if x_fraction > 0:
+        zooms.append(math.log2(width / TILE_SIZE / x_fraction))
+    if y_fraction > 0:
+        zooms.append(math.log2(height / TILE_SIZE / y_fraction))
+
+    return center, int(min(max(math.floor(min(zooms)), 0), max_zoom))
+
+
+def pixel_size(zoom, latitude):
+    """Tamanho de um pixel em graus no zoom e latitude (o menor entre os eixos, em latitude)"""
+    return 360 / (TILE_SIZE * 2 ** zoom) * math.cos(math.radians(latitude))
+
+
+def simplify_for_map(geometries, zoom, latitude):
+    """Simplifica as geometrias para o zoom do mapa e arredonda as coordenadas na mesma grade"""
+    import shapely
+
+    tolerance = pixel_size(zoom + DETAIL_ZOOM_LEVELS, latitude)
+    grid = 10 ** math.floor(math.log10(tolerance))
+    simplified = shapely.simplify(np.asarray(geometries, dtype=object), tolerance, preserve_topology=True)
+    return pd.Series(shapely.set_precision(simplified, grid), index=geometries.index)
+
+
+def linked_image_overlay(url, bounds, **kwargs):
+    """ImageOverlay que referencia a imagem por URL; o folium embute em base64 qualquer caminho local
+    (e trata URLs relativas como caminhos), então a URL é trocada depois de criar a camada"""
+    import folium
+
+    overlay = folium.raster_layers.ImageOverlay(image='data:,', bounds=bounds, **kwargs)
+    overlay.url = url
+    return overlay
+
+
+def write_parcel_map(geometries, path, overlays=(), overlay_bounds=None, width=1024, height=768,
+                     basemap='satellite', max_polygons=5000, color='red', weight=2, opacity=0.8,
+                     image_format='webp'):
+    """Grava um mapa HTML com os contornos das parcelas e os heatmaps de NDVI como camadas.
+
+    overlays é uma lista de (caminho do PNG, rótulo), posicionados sobre overlay_bounds (padrão: o
+    retângulo envolvente de todas as geometrias) e gravados como quadros image_format em map_frames/;
+    só a última camada começa visível. basemap pode ser 'satellite', 'osm' ou None (sem fundo, sem
+    nenhum acesso à rede no navegador). width e height são o tamanho de janela considerado no cálculo
+    do zoom inicial.
+    """
+    import folium
+    import shapely
+    from folium.plugins import FastMarkerCluster
+    from shapely.geometry import mapping
+
+    from src.timelapse import convert_frame
+
+    geometries = as_geoseries(geometries)
+    array = np.asarray(geometries, dtype=object)
+    bounds = tuple(float(v) for v in shapely.total_bounds(array))
+    center, zoom = map_view(bounds, width, height)
+
+    m = folium.Map(location=center, zoom_start=zoom, tiles=None)
+    if basemap is not None:
+        tiles, attribution = BASEMAPS[basemap]
+        folium.TileLayer(tiles=tiles, attr=attribution, name=basemap, max_zoom=MAX_ZOOM + 1).add_to(m)
+
+    overlay_bounds = bounds if overlay_bounds is None else overlay_bounds
+    minx, miny, maxx, maxy = overlay_bounds
+    frames_dir = os.path.join(os.path.dirname(path), 'map_frames')
+    if overlays:
+        os.makedirs(frames_dir, exist_ok=True)
+    for i, (image_path, label) in enumerate(overlays):
+        name = f'{os.path.splitext(os.path.basename(image_path))[0]}.{image_format}'
+        convert_frame(image_path, os.path.join(frames_dir, name), image_format)
+        linked_image_overlay(f'map_frames/{name}', [[miny, minx], [maxy, maxx]], opacity=opacity,
+                             name=f'NDVI {label}', show=i == len(overlays) - 1).add_to(m)
+
+    if len(geometries) > max_polygons:
+        points = shapely.get_coordinates(shapely.point_on_surface(array))
+        FastMarkerCluster(np.round(points[:, ::-1], 6).tolist(), name='Parcelas').add_to(m)
+    else:
+        simplified = simplify_for_map(geometries, zoom, center[0])
+        collection = {
+            'type': 'FeatureCollection',
+            'features': [{'type': 'Feature', 'properties': {'parcel_id': str(parcel_id)}, 'geometry': mapping(geom)}
+                         for parcel_id, geom in simplified.items() if not geom.is_empty],
+        }
+        style = {'color': color, 'weight': weight, 'fillOpacity': 0}
+        folium.GeoJson(collection, name='Parcelas', style_function=lambda _: style,
+                       tooltip=folium.GeoJsonTooltip(['parcel_id'], labels=False)).add_to(m)
+
+    folium.LayerControl().add_to(m)
+    m.save(path)
+    return path
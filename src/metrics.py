@@ -0,0 +1,161 @@
+"""Instrumentação das execuções: tempos por etapa e contadores de chamadas remotas.
+
+O objeto global ``metrics`` acumula spans (tempo de cada etapa: número de execuções, tempo total e
+máximo) e contadores (chamadas getInfo, requisições HTTP, bytes baixados, acertos de cache). Ele
+começa desligado, a não ser que a variável de ambiente AGRO_METRICS=1 esteja definida; desligado,
+cada ponto instrumentado custa apenas a verificação de um atributo.
+
+Uso:
+    from src.metrics import metrics
+    metrics.enable()
+    with metrics.span('get_all_data'):
+        ...
+    metrics.increment('ee_getinfo_calls')
+    metrics.to_json('data/results/run_metrics.json')
+    metrics.to_prometheus('data/results/run_metrics.prom')
+"""
+import functools
+import json
+import os
+import re
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime, timezone
+
+NULL_SPAN = nullcontext()
+
+
+class Span:
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self.started_at = datetime.now(timezone.utc)
+            self.counters = {}
+            self.spans = {}
+
+    def increment(self, name, value=1):
+        """Soma value ao contador name"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        """Registra uma execução de duração conhecida (ex.: medida em outro processo)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            count, total, maximum = self.spans.get(name, (0, 0.0, 0.0))
+            self.spans[name] = (count + 1, total + seconds, max(maximum, seconds))
+
+    def span(self, name):
+        """Context manager que mede o tempo de uma etapa"""
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name)
+
+    def timed(self, name=None):
+        """Decorador que mede cada chamada da função como um span (nome padrão: Classe.método)"""
+        def decorator(function):
+            span_name = name or function.__qualname__
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with Span(self, span_name):
+                    return function(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def report(self):
+        """Relatório da execução em um dicionário serializável em JSON"""
+        with self._lock:
+            spans = {
+                name: {'count': count, 'total_seconds': total, 'mean_seconds': total / count,
+                       'max_seconds': maximum}
+                for name, (count, total, maximum) in sorted(self.spans.items())
+            }
+            counters = dict(sorted(self.counters.items()))
+
+        return {
+            'started_at': self.started_at.isoformat(),
+            'elapsed_seconds': (datetime.now(timezone.utc) - self.started_at).total_seconds(),
+            'spans': spans,
+            'counters': counters,
+        }
+
+    def to_json(self, path=None):
+        """Relatório da execução em JSON; grava em path se informado"""
+        text = json.dumps(self.report(), indent=2)
+        if path is not None:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+        return text
+
+    def to_prometheus(self, path=None, prefix='agroanalysis'):
+        """Métricas no formato texto do Prometheus (ex.: para o textfile collector do node_exporter)"""
+        report = self.report()
+        lines = []
+
+        for name, value in report['counters'].items():
+            metric = f'{prefix}_{sanitize_metric_name(name)}_total'
+            lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{metric} {value}')
+
+        for suffix, field, kind in (('stage_calls_total', 'count', 'counter'),
+                                    ('stage_seconds_total', 'total_seconds', 'counter'),
+                                    ('stage_seconds_max', 'max_seconds', 'gauge')):
+            if not report['spans']:
+                break
+            metric = f'{prefix}_{suffix}'
+            lines.append(f'# TYPE {metric} {kind}')
+            for name, values in report['spans'].items():
+                lines.append(f'{metric}{{stage="{escape_label(name)}"}} {values[field]}')
+
+        text = '\n'.join(lines) + '\n'
+        if path is not None:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+        return text
+
+
+def sanitize_metric_name(name):
+    return re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+
+def escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+metrics = Metrics(enabled=os.environ.get('AGRO_METRICS', '') not in ('', '0'))
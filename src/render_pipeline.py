@@ -0,0 +1,250 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from src.data_visualization import NDVIVisualization
+from src.report import write_report
+from src.maps import is_local_geometry
+from src.metrics import metrics
+
+# Tarefa -> (método do NDVIVisualization, arquivos gerados dentro do output_dir)
+RENDER_TASKS = {
+    'ndvi_data': ('plot_ndvi_data', ['iterative_ndvi.html']),
+    'histograma_freq': ('plot_histograma_freq', ['iterative_histogram.html']),
+    'timeseries': ('plot_timeseries', ['temporal_ndvi_mean.png']),
+    'boxplot': ('plot_boxplot', ['iterative_boxplot.html']),
+    'images_timelapse': ('plot_images_timelapse', ['images_slider.html']),
+    'images_timelapse_assets': ('plot_images_timelapse_assets', ['timelapse/index.html']),
+    'report': ('plot_report', ['report/index.html']),
+    'mapdisplay': ('plot_mapdisplay', ['map.html']),
+}
+
+# Tarefas que dependem da sessão do Earth Engine quando a feature é um objeto do ee; nesse caso rodam no
+# processo principal. Com uma geometria local (shapely) rodam nos workers como as demais
+LOCAL_TASKS = {'mapdisplay'}
+
+# Tarefas cujo resultado depende apenas dos heatmaps mensais em disco, e não do DataFrame
+IMAGE_TASKS = {'images_timelapse', 'images_timelapse_assets'}
+
+# HTMLs autocontidos (cada um com o plotly.js inteiro) dos gráficos que também estão no relatório
+REPORT_CHART_TASKS = {'ndvi_data', 'histograma_freq', 'boxplot'}
+
+
+def render_task(task, df_data, start_date, output_dir, feature=None):
+    """Executa uma tarefa de renderização sobre uma cópia própria dos dados (roda nos workers).
+
+    Retorna a duração da tarefa, registrada nas métricas pelo processo principal.
+    """
+    start = time.perf_counter()
+    method, _ = RENDER_TASKS[task]
+    os.makedirs(output_dir, exist_ok=True)
+    visualization = NDVIVisualization(df_data=df_data.copy(), start_date=start_date, feature=feature,
+                                      output_dir=output_dir)
+    getattr(visualization, method)()
+    return time.perf_counter() - start
+
+
+class RenderPipeline:
+    """Pipeline de renderização incremental e paralelo das saídas do NDVIVisualization.
+
+    Cada gráfico recebe sua própria cópia dos dados e roda em um pool de processos. Como no make,
+    uma saída só é refeita quando o hash dos dados de entrada e dos parâmetros mudou ou quando algum
+    dos arquivos gerados não existe mais; os hashes ficam em um manifest JSON.
+    """
+
+    def __init__(self, manifest_path='data/results/render_manifest.json', max_workers=None):
+        self.manifest_path = manifest_path
+        self.max_workers = max_workers
+
+    def load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save_manifest(self, manifest):
+        os.makedirs(os.path.dirname(self.manifest_path) or '.', exist_ok=True)
+        tmp_path = f'{self.manifest_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    @staticmethod
+    def data_hash(df_data):
+        """Hash do conteúdo do DataFrame (valores, índice e nomes das colunas)"""
+        digest = hashlib.sha1(pd.util.hash_pandas_object(df_data, index=True).values.tobytes())
+        digest.update(json.dumps(list(map(str, df_data.columns))).encode())
+        return digest.hexdigest()
+
+    @staticmethod
+    def geometry_hash(feature):
+        """Hash das geometrias locais (uma geometria shapely ou uma série por parcela)"""
+        geometries = feature if isinstance(feature, pd.Series) else pd.Series([feature])
+        digest = hashlib.sha1()
+        for parcel_id, geom in geometries.items():
+            digest.update(str(parcel_id).encode())
+            digest.update(geom.wkb)
+        return digest.hexdigest()
+
+    @classmethod
+    def task_hash(cls, task, data_hash, start_date, visualization):
+        """Hash das entradas de uma tarefa: dados e parâmetros ou, no timelapse, os heatmaps usados.
+
+        O mapa local depende das geometrias e dos heatmaps sobrepostos, e não do DataFrame.
+        """
+        params = {'task': task, 'start_date': start_date}
+        local_map = task == 'mapdisplay' and is_local_geometry(visualization.feature)
+        if local_map:
+            params['geometry'] = cls.geometry_hash(visualization.feature)
+
+        if task in IMAGE_TASKS or local_map:
+            images_path, _ = visualization.get_timelapse_frames()
+            params['images'] = [
+                [path, os.path.getsize(path), os.path.getmtime(path)] if os.path.exists(path) else [path]
+                for path in images_path
+            ]
+        else:
+            params['data'] = data_hash
+        return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+    def plan(self, jobs, tasks, force=False):
+        """Lista as tarefas desatualizadas de cada job (output_dir, df_data, start_date, feature)"""
+        manifest = self.load_manifest()
+        pending = []
+
+        for output_dir, df_data, start_date, feature in jobs:
+            data_hash = self.data_hash(df_data)
+            visualization = NDVIVisualization(df_data, start_date, feature, output_dir)
+
+            for task in tasks:
+                key = f'{output_dir}:{task}'
+                digest = self.task_hash(task, data_hash, start_date, visualization)
+                outputs = [os.path.join(output_dir, name) for name in RENDER_TASKS[task][1]]
+
+                if not force and manifest.get(key) == digest and all(os.path.exists(o) for o in outputs):
+                    continue
+                pending.append((key, digest, task, df_data, start_date, output_dir, feature))
+
+        return manifest, pending
+
+    @metrics.timed()
+    def run_many(self, jobs, tasks=None, force=False):
+        """Renderiza vários jobs (ex.: uma pasta por parcela) e retorna o status de cada tarefa.
+
+        A falha de uma tarefa é registrada no status ('failed: <erro>') e não impede as demais; ela
+        fica fora do manifest e é tentada de novo na próxima execução.
+        """
+        tasks = [t for t in RENDER_TASKS if t != 'mapdisplay'] if tasks is None else tasks
+        manifest, pending = self.plan(jobs, tasks, force)
+
+        status = {f'{output_dir}:{task}': 'skipped' for output_dir, _, _, _ in jobs for task in tasks}
+        metrics.increment('render_cache_hits', len(status) - len(pending))
+
+        in_process = [job[2] in LOCAL_TASKS and not is_local_geometry(job[6]) for job in pending]
+        remote = [job for job, flag in zip(pending, in_process) if not flag]
+        local = [job for job, flag in zip(pending, in_process) if flag]
+
+        def finish(key, digest, task, result):
+            try:
+                metrics.observe(f'render.{task}', result())
+            except Exception as e:
+                metrics.increment('render_failures')
+                status[key] = f'failed: {e!r}'
+                return
+            manifest[key] = digest
+            status[key] = 'built'
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                key: executor.submit(render_task, task, df_data, start_date, output_dir, feature)
+                for key, _, task, df_data, start_date, output_dir, feature in remote
+            }
+
+            # Tarefas com objetos do Earth Engine rodam aqui enquanto os workers trabalham
+            for key, digest, task, df_data, start_date, output_dir, feature in local:
+                finish(key, digest, task, lambda: render_task(task, df_data, start_date, output_dir, feature))
+
+            for key, digest, task, *_ in remote:
+                finish(key, digest, task, futures[key].result)
+
+        self.save_manifest(manifest)
+        return status
+
+    def run(self, df_data, start_date, feature=None, output_dir='data/results', tasks=None, force=False):
+        """Renderiza as saídas de uma parcela; mapdisplay só entra se a feature for informada"""
+        if tasks is None:
+            tasks = [t for t in RENDER_TASKS if feature is not None or t not in LOCAL_TASKS]
+        return self.run_many([(output_dir, df_data, start_date, feature)], tasks, force)
+
+    def run_parcels(self, df_parcels, start_date, output_root='data/results/parcels', tasks=None, force=False,
+                    geometries=None):
+        """Renderiza as saídas de todas as parcelas de um DataFrame longo (coluna parcel_id).
+
+        Com a tarefa report (incluída por padrão) é gerado um único relatório com todas as parcelas em
+        <output_root>/report e o plotly.js gravado uma vez em output_root; os HTMLs autocontidos dos
+        mesmos gráficos deixam de ser gerados por parcela. As demais tarefas rodam em uma pasta por
+        parcela. Com geometries (série de geometrias shapely indexada pelo parcel_id, como a do
+        get_parcels) cada parcela também ganha o mapa local, desenhado nos workers sem o Earth Engine.
+        As tarefas de timelapse ficam de fora: os heatmaps mensais em disco são os da região do
+        shapefile, e não de cada parcela.
+        """
+        if tasks is not None and IMAGE_TASKS.intersection(tasks):
+            raise ValueError(f'As tarefas {sorted(IMAGE_TASKS.intersection(tasks))} usam os heatmaps da região '
+                             f'inteira e não podem ser geradas por parcela')
+
+        if tasks is None:
+            tasks = [t for t in RENDER_TASKS
+                     if t not in IMAGE_TASKS and (geometries is not None or t not in LOCAL_TASKS)]
+        build_report = 'report' in tasks
+        if build_report:
+            tasks = [t for t in tasks if t != 'report' and t not in REPORT_CHART_TASKS]
+
+        groups = [(parcel_id, df.drop(columns='parcel_id').reset_index(drop=True))
+                  for parcel_id, df in df_parcels.groupby('parcel_id', sort=True)]
+        jobs = [
+            (os.path.join(output_root, str(parcel_id)), df, start_date,
+             None if geometries is None else geometries.get(parcel_id))
+            for parcel_id, df in groups
+        ]
+
+        status = self.run_many(jobs, tasks, force) if tasks else {}
+        if build_report:
+            status.update(self.run_parcels_report(groups, start_date, output_root, force))
+        return status
+
+    @metrics.timed()
+    def run_parcels_report(self, groups, start_date, output_root, force=False):
+        """Relatório único de várias parcelas [(parcel_id, df_data)], refeito só quando algum dado mudou"""
+        key = f'{output_root}:report'
+        params = {'task': 'report', 'start_date': start_date,
+                  'data': [[str(parcel_id), self.data_hash(df)] for parcel_id, df in groups]}
+        digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+        report_dir = os.path.join(output_root, 'report')
+
+        manifest = self.load_manifest()
+        if not force and manifest.get(key) == digest and os.path.exists(os.path.join(report_dir, 'index.html')):
+            metrics.increment('render_cache_hits')
+            return {key: 'skipped'}
+
+        start = time.perf_counter()
+        try:
+            figures = {parcel_id: NDVIVisualization(df, start_date, None, output_root).build_figures()
+                       for parcel_id, df in groups}
+            write_report(figures, report_dir, asset_dir=output_root)
+        except Exception as e:
+            metrics.increment('render_failures')
+            return {key: f'failed: {e!r}'}
+        metrics.observe('render.report', time.perf_counter() - start)
+
+        manifest[key] = digest
+        self.save_manifest(manifest)
+        return {key: 'built'}
+
+    @staticmethod
+    def failures(status):
+        """Tarefas que falharam em um status do run/run_many, com a mensagem de erro"""
+        return {key: state for key, state in status.items() if state.startswith('failed')}
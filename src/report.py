@@ -0,0 +1,84 @@
+import html
+import os
+
+REPORT_TEMPLATE = '''<!DOCTYPE html>
+<html lang="pt-br">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="{plotlyjs}"></script>
+<style>
+  body {{ font-family: sans-serif; margin: 16px; }}
+  .chart {{ width: 100%; height: 450px; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+{sections}
+<script>
+  // Os dados de cada gráfico ficam em JSON compacto; a biblioteca plotly.js é carregada uma única vez
+  document.querySelectorAll('.chart').forEach(async (div) => {{
+    const spec = div.dataset.src
+      ? await (await fetch(div.dataset.src)).json()
+      : JSON.parse(document.getElementById(div.id + '-data').textContent);
+    Plotly.newPlot(div, spec.data, spec.layout, {{responsive: true}});
+  }});
+</script>
+</body>
+</html>
+'''
+
+
+def write_plotlyjs(output_dir):
+    """Grava o plotly.js uma única vez por versão e retorna o nome do arquivo"""
+    from plotly.offline import get_plotlyjs, get_plotlyjs_version
+
+    name = f'plotly-{get_plotlyjs_version()}.min.js'
+    path = os.path.join(output_dir, name)
+    if not os.path.exists(path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(get_plotlyjs())
+    return name
+
+
+def write_report(figures, output_dir='data/results/report', title='Relatório NDVI', inline_data=True,
+                 asset_dir=None):
+    """Gera um relatório com vários gráficos (de uma ou várias parcelas) compartilhando o plotly.js.
+
+    figures é um dicionário {parcela: {nome do gráfico: figura plotly}}. O JSON de cada gráfico é
+    gravado em data/<parcela>/<gráfico>.json; com inline_data=True ele também vai embutido na página,
+    que assim abre direto do disco, e com inline_data=False a página busca os JSON por HTTP. O plotly.js
+    é gravado em asset_dir (padrão: output_dir) e referenciado por caminho relativo, então vários
+    relatórios podem usar a mesma cópia.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    asset_dir = output_dir if asset_dir is None else asset_dir
+    os.makedirs(asset_dir, exist_ok=True)
+    plotlyjs = os.path.relpath(os.path.join(asset_dir, write_plotlyjs(asset_dir)), output_dir).replace(os.sep, '/')
+
+    sections = []
+    for parcel_id, parcel_figures in figures.items():
+        sections.append(f'<h2>{html.escape(str(parcel_id))}</h2>')
+        data_dir = os.path.join(output_dir, 'data', str(parcel_id))
+        os.makedirs(data_dir, exist_ok=True)
+
+        for name, fig in parcel_figures.items():
+            spec_json = fig.to_json(pretty=False)
+            with open(os.path.join(data_dir, f'{name}.json'), 'w', encoding='utf-8') as f:
+                f.write(spec_json)
+
+            chart_id = html.escape(f'chart-{parcel_id}-{name}', quote=True)
+            src = f'data/{parcel_id}/{name}.json'
+            if inline_data:
+                # '</' não pode aparecer dentro do <script>
+                inline_json = spec_json.replace('</', '<\\/')
+                sections.append(f'<div class="chart" id="{chart_id}"></div>')
+                sections.append(f'<script type="application/json" id="{chart_id}-data">{inline_json}</script>')
+            else:
+                sections.append(f'<div class="chart" id="{chart_id}" data-src="{html.escape(src, quote=True)}"></div>')
+
+    path = os.path.join(output_dir, 'index.html')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(REPORT_TEMPLATE.format(title=html.escape(title), plotlyjs=html.escape(plotlyjs, quote=True), sections='\n'.join(sections)))
+
+    return path
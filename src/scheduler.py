@@ -0,0 +1,183 @@
+"""Agendador central das chamadas remotas (getInfo, URLs de thumbnail e downloads).
+
+Toda chamada passa por:
+- um token bucket, que limita a taxa sustentada de requisições (rate por segundo, rajadas até burst);
+- um limite de concorrência adaptativo (AIMD): cresce aos poucos a cada sucesso e cai pela metade
+  quando o servidor responde com erro de cota, sem ficar abaixo de min_concurrency;
+- novas tentativas com backoff exponencial e jitter completo para erros de cota e erros transitórios
+  (timeout, erro interno, conexão); os demais erros sobem na hora;
+- coalescência: chamadas com a mesma chave que chegam enquanto uma igual está em andamento esperam
+  o resultado dela em vez de repetir a computação no servidor.
+
+É a única camada de novas tentativas: a sessão HTTP dos downloads não repete requisições, então um erro
+5xx chega aqui com o status da resposta e é tratado como transitório, sem reduzir a concorrência.
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from concurrent.futures import Future
+
+from src.metrics import metrics
+
+# Só mensagens de cota: 'too many' sozinho também casaria com 'too many 503 error responses' do urllib3
+QUOTA_ERROR = re.compile(r'too many (?:requests|concurrent)|quota|rate limit|capacity exceeded|resource.?exhausted|\b429\b', re.IGNORECASE)
+TRANSIENT_ERROR = re.compile(r'timed? ?out|internal error|service unavailable|backend error|connection|\b50[234]\b',
+                             re.IGNORECASE)
+RETRY_STATUS = (408, 429, 500, 502, 503, 504)
+
+
+def status_code(error):
+    return getattr(getattr(error, 'response', None), 'status_code', None)
+
+
+def is_quota_error(error):
+    """Erro de cota/limite de taxa do Earth Engine ou HTTP 429"""
+    code = status_code(error)
+    if code is not None:
+        return code == 429
+    return bool(QUOTA_ERROR.search(str(error)))
+
+
+def is_transient_error(error):
+    """Erro que pode passar numa nova tentativa: timeout, falha de conexão ou erro 5xx do servidor"""
+    code = status_code(error)
+    if code is not None:
+        return code in RETRY_STATUS
+    return isinstance(error, (ConnectionError, TimeoutError)) or bool(TRANSIENT_ERROR.search(str(error)))
+
+
+class TokenBucket:
+    """Limite de taxa: rate fichas por segundo, acumulando no máximo capacity fichas"""
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate or 1, 1)
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = self.capacity
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Bloqueia até haver fichas disponíveis; rate=None desliga o limite"""
+        if self.rate is None:
+            return
+        while True:
+            with self._lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            self.sleep(wait)
+
+
+class RemoteScheduler:
+    def __init__(self, rate=20.0, burst=None, initial_concurrency=8, min_concurrency=1, max_concurrency=32,
+                 retries=5, base_delay=0.5, max_delay=30.0, cooldown=1.0, seed=None, clock=time.monotonic,
+                 sleep=time.sleep):
+        self.bucket = TokenBucket(rate, burst, clock=clock, sleep=sleep)
+        self.concurrency = float(initial_concurrency)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.cooldown = cooldown
+        self.clock = clock
+        self.sleep = sleep
+        self.random = random.Random(seed)
+
+        self._active = 0
+        self._last_decrease = None
+        self._slots = threading.Condition()
+        self._lock = threading.Lock()
+        self._in_flight = {}
+
+    @staticmethod
+    def fingerprint(*parts):
+        """Chave de coalescência: objetos do Earth Engine entram pelo grafo serializado da computação"""
+        serialized = [
+            part.serialize() if hasattr(part, 'serialize') else json.dumps(part, sort_keys=True, default=repr)
+            for part in parts
+        ]
+        return hashlib.sha1('\x1f'.join(serialized).encode()).hexdigest()
+
+    def backoff(self, attempt):
+        """Espera antes da tentativa attempt + 1: backoff exponencial com jitter completo"""
+        return self.random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _acquire_slot(self):
+        with self._slots:
+            while self._active >= max(int(self.concurrency), self.min_concurrency):
+                self._slots.wait()
+            self._active += 1
+
+    def _release_slot(self, quota_error=False):
+        with self._slots:
+            self._active -= 1
+            if quota_error:
+                now = self.clock()
+                # Vários erros de cota simultâneos contam como um só sinal de sobrecarga
+                if self._last_decrease is None or now - self._last_decrease >= self.cooldown:
+                    self.concurrency = max(self.min_concurrency, self.concurrency / 2)
+                    self._last_decrease = now
+            else:
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+            self._slots.notify_all()
+
+    def _execute(self, function, args, kwargs):
+        for attempt in range(self.retries + 1):
+            self.bucket.acquire()
+            self._acquire_slot()
+            try:
+                result = function(*args, **kwargs)
+            except Exception as e:
+                quota_error = is_quota_error(e)
+                self._release_slot(quota_error=quota_error)
+                if quota_error:
+                    metrics.increment('scheduler_quota_errors')
+                if attempt == self.retries or not (quota_error or is_transient_error(e)):
+                    raise
+                metrics.increment('scheduler_retries')
+                self.sleep(self.backoff(attempt))
+            else:
+                self._release_slot()
+                return result
+
+    def call(self, function, *args, key=None, **kwargs):
+        """Executa function(*args, **kwargs) sob o limite de taxa e de concorrência, com novas tentativas.
+
+        Se key for informada e já houver uma chamada com a mesma chave em andamento, espera e devolve
+        o resultado (ou o erro) dela.
+        """
+        if key is None:
+            return self._execute(function, args, kwargs)
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[key] = future
+
+        if not owner:
+            metrics.increment('scheduler_coalesced')
+            return future.result()
+
+        try:
+            result = self._execute(function, args, kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
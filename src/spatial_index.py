@@ -0,0 +1,57 @@
+import numpy as np
+
+
+class ParcelIndex:
+    """Índice espacial (STRtree) das parcelas de um shapefile, indexadas pelo ID da parcela"""
+
+    def __init__(self, parcels):
+        from shapely import STRtree
+
+        self.ids = list(parcels.index)
+        self.geometries = np.asarray(parcels.values, dtype=object)
+        self.tree = STRtree(self.geometries)
+
+    def query(self, geometry, predicate='intersects'):
+        """IDs das parcelas que satisfazem o predicado com a geometria"""
+        return [self.ids[i] for i in sorted(self.tree.query(geometry, predicate=predicate))]
+
+    def group_by_tiles(self, tiles):
+        """Agrupa as parcelas pelos footprints dos tiles ({tile: geometria shapely}).
+
+        A parcela entra em todos os tiles que a contêm inteira (na sobreposição entre tiles cada um pode
+        ter cenas que o outro não tem, por causa do filtro de nuvens); se nenhum a contém, vai só para
+        o de maior área de interseção. Retorna ({tile: [IDs]}, IDs fora de todos os tiles).
+        """
+        import shapely
+
+        containing = {}
+        partial = {}
+        for tile, footprint in sorted(tiles.items()):
+            candidates = self.tree.query(footprint, predicate='intersects')
+            if len(candidates) == 0:
+                continue
+
+            geometries = self.geometries[candidates]
+            contained = shapely.contains(footprint, geometries)
+            for i in candidates[contained]:
+                containing.setdefault(i, []).append(tile)
+
+            areas = shapely.area(shapely.intersection(geometries[~contained], footprint))
+            for i, area in zip(candidates[~contained], areas):
+                if i not in partial or area > partial[i][0]:
+                    partial[i] = (area, tile)
+
+        groups = {}
+        unassigned = []
+        for i, parcel_id in enumerate(self.ids):
+            if i in containing:
+                parcel_tiles = containing[i]
+            elif i in partial:
+                parcel_tiles = [partial[i][1]]
+            else:
+                unassigned.append(parcel_id)
+                continue
+            for tile in parcel_tiles:
+                groups.setdefault(tile, []).append(parcel_id)
+
+        return groups, unassigned
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+
+class SceneStatsCache:
+    """Cache em disco das estatísticas por cena, permitindo atualizações incrementais do get_all_data.
+
+    As cenas são guardadas pelo ID (system:index) junto com a chave de contexto formada pelo hash da
+    geometria, índices, conjunto de reducers, escala, limite de nuvens e backend de cálculo. Se qualquer
+    um deles mudar, o cache é invalidado e recalculado do zero.
+
+    Os períodos já consultados ficam em 'covered', uma lista de intervalos [início, fim) disjuntos; só
+    as partes do período pedido fora desses intervalos são consultadas de novo, então rodar 2023, 2025
+    e depois 2024 busca o ano do meio em vez de assumir que o cache é contínuo.
+    """
+
+    def __init__(self, cache_dir, name):
+        self.cache_dir = cache_dir
+        self.path = os.path.join(cache_dir, f'scene_stats_{name}.json')
+
+    @staticmethod
+    def geometry_hash(geom):
+        """Hash estável da geometria (WKB), usado para detectar mudanças no shapefile"""
+        return hashlib.sha1(geom.wkb).hexdigest()
+
+    @staticmethod
+    def make_key(geometry_hash, reducers, scale, cloud_coverage_threshold, backend=None, indices=('NDVI',)):
+        """Chave de contexto do cache"""
+        params = {
+            'backend': backend,
+            'geometry': geometry_hash,
+            'indices': list(indices),
+            'reducers': list(reducers),
+            'scale': scale,
+            'cloud_coverage_threshold': cloud_coverage_threshold,
+        }
+        return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+    def load(self, key):
+        """Lê o cache; retorna None se não existir ou se a chave de contexto for diferente"""
+        if not os.path.exists(self.path):
+            return None
+
+        with open(self.path, 'r', encoding='utf-8') as f:
+            content = json.load(f)
+
+        if content.get('key') != key:
+            self.invalidate()
+            return None
+
+        return content
+
+    def save(self, key, covered, scenes):
+        """Grava o cache de forma atômica"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        content = {'key': key, 'covered': [list(interval) for interval in covered], 'scenes': scenes}
+
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(content, f)
+        os.replace(tmp_path, self.path)
+
+    def invalidate(self):
+        """Remove o cache do disco"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    @staticmethod
+    def high_water_mark(records):
+        """Data da cena mais recente entre os registros"""
+        dates = [record['date'] for record in records if record.get('date')]
+        return max(dates) if dates else None
+
+    @classmethod
+    def covered_intervals(cls, content):
+        """Intervalos [início, fim) já consultados; caches antigos (só com covered_start) cobrem do
+        covered_start até a cena mais recente"""
+        if content is None:
+            return []
+        if 'covered' in content:
+            return [tuple(interval) for interval in content['covered']]
+
+        high_water_mark = cls.high_water_mark(content['scenes'].values())
+        if high_water_mark is None or content['covered_start'] >= high_water_mark:
+            return []
+        return [(content['covered_start'], high_water_mark)]
+
+    @staticmethod
+    def missing_intervals(covered, start_date, end_date):
+        """Partes de [start_date, end_date) fora dos intervalos cobertos"""
+        missing = []
+        cursor = start_date
+        for interval_start, interval_end in sorted(covered):
+            if interval_end <= cursor:
+                continue
+            if interval_start >= end_date:
+                break
+            if interval_start > cursor:
+                missing.append((cursor, interval_start))
+            cursor = max(cursor, interval_end)
+        if cursor < end_date:
+            missing.append((cursor, end_date))
+        return missing
+
+    @staticmethod
+    def add_interval(covered, start_date, end_date):
+        """União dos intervalos cobertos com [start_date, end_date), mesclando os que se tocam"""
+        if start_date >= end_date:
+            return list(covered)
+
+        merged = []
+        for interval_start, interval_end in sorted(list(covered) + [(start_date, end_date)]):
+            if merged and interval_start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], interval_end))
+            else:
+                merged.append((interval_start, interval_end))
+        return merged
+
+    @staticmethod
+    def merge(content, records):
+        """Adiciona (ou substitui) os registros novos no cache, indexados pelo ID da cena"""
+        scenes = dict(content['scenes']) if content else {}
+        for record in records:
+            scenes[record['scene_id']] = record
+        return scenes
+
+    @staticmethod
+    def records_between(scenes, start_date, end_date):
+        """Registros do cache dentro do período pedido, ordenados por data"""
+        records = [r for r in scenes.values() if r.get('date') and start_date <= r['date'] < end_date]
+        return sorted(records, key=lambda r: (r['date'], r['scene_id']))
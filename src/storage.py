@@ -0,0 +1,138 @@
+import os
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from src.indices import STATISTICS
+
+STORE_SCHEMA = pa.schema([
+    ('parcel_id', pa.string()),
+    ('date', pa.date32()),
+    ('ndvi_mean', pa.float64()),
+    ('ndvi_max', pa.float64()),
+    ('ndvi_min', pa.float64()),
+    ('ndvi_median', pa.float64()),
+    ('ndvi_stdDev', pa.float64()),
+    # Contagem de pixels por bin de NDVI (src/histograms.py); nula em registros sem histograma
+    ('ndvi_histogram', pa.list_(pa.int32())),
+    ('written_at', pa.timestamp('us')),
+])
+# Colunas lidas por padrão: as estatísticas, sem o histograma e o controle de escrita
+DEFAULT_COLUMNS = ['parcel_id', 'date', 'ndvi_mean', 'ndvi_max', 'ndvi_min', 'ndvi_median', 'ndvi_stdDev']
+PARTITIONING = ds.partitioning(pa.schema([('parcel_id', pa.string()), ('year', pa.int32())]), flavor='hive')
+
+
+class NDVIStore:
+    """Armazenamento colunar (Parquet) dos resultados de NDVI, particionado por parcela e ano.
+
+    As escritas são apenas de acréscimo: cada append cria novos arquivos na partição
+    parcel_id=<id>/year=<ano>. Na leitura, registros repetidos da mesma parcela e data são
+    resolvidos mantendo o mais recente (coluna written_at). Só as estatísticas do NDVI têm colunas no
+    esquema; DataFrames com outros índices são recusados em vez de perder colunas.
+
+    A coluna ndvi_histogram guarda a contagem de pixels por bin de NDVI de cada cena; ela não é lida por
+    padrão, peça com read(columns=[..., 'ndvi_histogram']) e use as funções de src/histograms.py.
+    """
+
+    def __init__(self, root='data/processed/ndvi_store'):
+        self.root = root
+
+    @staticmethod
+    def validate_columns(columns):
+        """Recusa estatísticas de outros índices além do NDVI, que não cabem no esquema do armazenamento"""
+        stats = [c for c in columns if c.rsplit('_', 1)[-1] in STATISTICS]
+        unsupported = [c for c in stats if c not in STORE_SCHEMA.names]
+        missing = [c for c in DEFAULT_COLUMNS[2:] if c not in columns]
+        if unsupported or missing:
+            raise ValueError(f'O NDVIStore guarda apenas as estatísticas do NDVI (indices=(\'NDVI\',)); '
+                             f'colunas não suportadas: {unsupported}, faltando: {missing}')
+
+    def append(self, df, parcel_id=None):
+        """Acrescenta um DataFrame no formato do get_all_data (com ou sem a coluna parcel_id)"""
+        self.validate_columns(df.columns)
+        df = df.copy()
+        if 'parcel_id' not in df.columns:
+            if parcel_id is None:
+                raise ValueError('Informe o parcel_id ou uma coluna parcel_id no DataFrame')
+            df['parcel_id'] = parcel_id
+
+        df['parcel_id'] = df['parcel_id'].astype(str)
+        if 'ndvi_histogram' not in df.columns:
+            df['ndvi_histogram'] = None
+        df['date'] = pd.to_datetime(df['date']).dt.date
+        df['year'] = pd.to_datetime(df['date']).dt.year.astype('int32')
+        df['written_at'] = pd.Timestamp.now()
+
+        schema = STORE_SCHEMA.append(pa.field('year', pa.int32()))
+        table = pa.Table.from_pandas(df[schema.names], schema=schema, preserve_index=False)
+
+        os.makedirs(self.root, exist_ok=True)
+        ds.write_dataset(
+            table,
+            self.root,
+            format='parquet',
+            partitioning=PARTITIONING,
+            basename_template=f'part-{uuid.uuid4().hex}-{{i}}.parquet',
+            existing_data_behavior='overwrite_or_ignore',
+        )
+
+    def missing(self, df, parcel_id=None):
+        """Linhas do DataFrame cuja parcela e data ainda não estão no armazenamento"""
+        parcel_ids = df['parcel_id'].astype(str) if 'parcel_id' in df.columns else pd.Series(str(parcel_id), df.index)
+        if df.empty or not os.path.exists(self.root):
+            return df
+
+        stored = self.dataset().to_table(columns=['parcel_id', 'date'],
+                                         filter=self.build_filter(parcel_ids.unique())).to_pandas()
+        keys = pd.MultiIndex.from_arrays([parcel_ids, pd.to_datetime(df['date']).dt.date])
+        stored_keys = pd.MultiIndex.from_arrays([stored['parcel_id'].astype(str), stored['date']])
+        return df[~keys.isin(stored_keys)]
+
+    def dataset(self):
+        # Schema explícito: arquivos gravados antes da coluna ndvi_histogram existir a leem como nula
+        schema = STORE_SCHEMA.append(pa.field('year', pa.int32()))
+        return ds.dataset(self.root, format='parquet', partitioning=PARTITIONING, schema=schema)
+
+    @staticmethod
+    def build_filter(parcels=None, start_date=None, end_date=None):
+        """Expressão de filtro por parcela e período [start_date, end_date); o ano poda as partições"""
+        expression = None
+
+        def add(condition):
+            return condition if expression is None else expression & condition
+
+        if parcels is not None:
+            expression = add(ds.field('parcel_id').isin([str(p) for p in parcels]))
+        if start_date is not None:
+            start_date = pd.Timestamp(start_date)
+            expression = add(ds.field('year') >= start_date.year)
+            expression = add(ds.field('date') >= pa.scalar(start_date.date(), pa.date32()))
+        if end_date is not None:
+            end_date = pd.Timestamp(end_date)
+            expression = add(ds.field('year') <= end_date.year)
+            expression = add(ds.field('date') < pa.scalar(end_date.date(), pa.date32()))
+
+        return expression
+
+    def read(self, columns=None, parcels=None, start_date=None, end_date=None):
+        """Lê apenas as colunas e o recorte (parcelas e período) pedidos, com as datas já tipadas"""
+        if not os.path.exists(self.root):
+            return pd.DataFrame(columns=columns or DEFAULT_COLUMNS)
+
+        key_columns = ['parcel_id', 'date', 'written_at']
+        requested = columns or DEFAULT_COLUMNS
+        scan_columns = list(dict.fromkeys(key_columns + list(requested)))
+
+        table = self.dataset().to_table(
+            columns=scan_columns,
+            filter=self.build_filter(parcels, start_date, end_date),
+        )
+        df = table.to_pandas(date_as_object=False)
+
+        df = (df.sort_values('written_at', kind='stable')
+                .drop_duplicates(subset=['parcel_id', 'date'], keep='last')
+                .sort_values(['parcel_id', 'date'], ignore_index=True))
+
+        return df[list(requested)]
@@ -0,0 +1,125 @@
+import numpy as np
+
+
+class StreamingStats:
+    """Reducer de passagem única e memória constante para média, desvio padrão, mínimo, máximo e mediana.
+
+    Média e variância são atualizadas bloco a bloco pela fórmula de Welford/Chan, e o resultado é
+    exato a menos de arredondamento de ponto flutuante (o desvio padrão é o populacional, como o
+    ee.Reducer.stdDev). Mínimo e máximo também são exatos.
+
+    A mediana (e qualquer outro quantil) vem de um histograma de bins fixos sobre value_range: cada
+    estatística de ordem é estimada dentro do bin que a contém e o quantil interpola as duas vizinhas
+    como o np.quantile. Assim o erro absoluto em relação ao np.quantile fica limitado à largura de um
+    bin, (max - min) / bins, ou seja 0.001 no padrão de 2000 bins sobre [-1, 1], mesmo quando a mediana
+    cai entre dois grupos de valores separados. Valores fora do intervalo são contados no primeiro/último
+    bin. O benchmarks/streaming_check.py confere esses limites.
+
+    Dois reducers com o mesmo histograma podem ser combinados com merge, o que permite reduzir
+    blocos em workers paralelos e juntar os resultados parciais no final.
+    """
+
+    def __init__(self, bins=2000, value_range=(-1.0, 1.0)):
+        self.bins = bins
+        self.value_range = value_range
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.histogram = np.zeros(bins, dtype=np.int64)
+
+    @classmethod
+    def from_values(cls, values, bins=2000, value_range=(-1.0, 1.0)):
+        """Cria um reducer já atualizado com um bloco de valores"""
+        stats = cls(bins, value_range)
+        stats.update(values)
+        return stats
+
+    def _combine(self, count, mean, m2, min_value, max_value, histogram):
+        """Junta estatísticas parciais às atuais (fórmula paralela de Chan et al.)"""
+        if count == 0:
+            return
+
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.min = min(self.min, min_value)
+        self.max = max(self.max, max_value)
+        self.histogram += histogram
+
+    def update(self, values):
+        """Consome um bloco de valores (NaN e infinitos são ignorados)"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[np.isfinite(values)]
+        if values.size == 0:
+            return
+
+        mean = values.mean()
+        m2 = np.square(values - mean).sum()
+
+        low, high = self.value_range
+        indexes = ((values - low) * (self.bins / (high - low))).astype(np.int64)
+        histogram = np.bincount(np.clip(indexes, 0, self.bins - 1), minlength=self.bins)
+
+        self._combine(values.size, mean, m2, values.min(), values.max(), histogram)
+
+    def merge(self, other):
+        """Incorpora o resultado parcial de outro reducer"""
+        if other.bins != self.bins or other.value_range != self.value_range:
+            raise ValueError('Só é possível combinar reducers com os mesmos bins e intervalo')
+
+        self._combine(other.count, other.mean, other.m2, other.min, other.max, other.histogram)
+        return self
+
+    def variance(self):
+        return self.m2 / self.count if self.count else None
+
+    def std(self):
+        return float(np.sqrt(self.variance())) if self.count else None
+
+    def order_statistic(self, rank):
+        """Valor aproximado da estatística de ordem rank (0 = menor valor): a posição dentro do bin é
+        interpolada linearmente, então a estimativa cai no mesmo bin do valor verdadeiro"""
+        low, high = self.value_range
+        width = (high - low) / self.bins
+
+        cumulative = np.cumsum(self.histogram)
+        index = min(int(np.searchsorted(cumulative, rank + 1, side='left')), self.bins - 1)
+        before = cumulative[index - 1] if index > 0 else 0
+        fraction = (rank + 0.5 - before) / self.histogram[index]
+
+        value = low + (index + fraction) * width
+        return float(min(max(value, self.min), self.max))
+
+    def quantile(self, q):
+        """Quantil aproximado com a mesma interpolação linear do np.quantile entre as duas estatísticas
+        de ordem vizinhas, limitado ao mínimo e máximo observados"""
+        if self.count == 0:
+            return None
+
+        position = q * (self.count - 1)
+        lower = int(np.floor(position))
+        upper = min(lower + 1, self.count - 1)
+        value = self.order_statistic(lower)
+        if upper != lower and position != lower:
+            value += (position - lower) * (self.order_statistic(upper) - value)
+        return value
+
+    def median(self):
+        return self.quantile(0.5)
+
+    def result(self):
+        """Estatísticas com os mesmos nomes do reducer combinado do Earth Engine"""
+        if self.count == 0:
+            return {'NDVI_mean': None, 'NDVI_min': None, 'NDVI_max': None, 'NDVI_stdDev': None, 'NDVI_median': None}
+
+        return {
+            'NDVI_mean': float(self.mean),
+            'NDVI_min': float(self.min),
+            'NDVI_max': float(self.max),
+            'NDVI_stdDev': self.std(),
+            'NDVI_median': self.median(),
+        }
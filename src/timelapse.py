@@ -0,0 +1,119 @@
+import json
+import os
+
+NDVI_PALETTE = [
+    'ffffff', 'ce7e45', 'df923d', 'f1b555', 'fcd163', '99b718', '74a901',
+    '66a000', '529400', '3e8601', '207401', '056201', '004c00', '023b01',
+    '012e01', '011d01', '011301'
+]
+
+TIMELAPSE_TEMPLATE = '''<!DOCTYPE html>
+<html lang="pt-br">
+<head>
+<meta charset="utf-8">
+<title>Timelapse NDVI</title>
+<style>
+  body {{ font-family: sans-serif; margin: 0; }}
+  #viewer {{ display: flex; align-items: center; gap: 12px; }}
+  #frame {{ max-width: 100%; height: 420px; object-fit: contain; }}
+  #colorbar {{ width: 18px; height: 300px; background: linear-gradient(to top, {gradient}); }}
+  #controls {{ display: flex; align-items: center; gap: 8px; padding: 8px 0; }}
+  #slider {{ flex: 1; }}
+  #label {{ font-size: 20px; min-width: 120px; }}
+</style>
+</head>
+<body>
+<div id="viewer">
+  <img id="frame" alt="NDVI">
+  <div>1</div><div id="colorbar" title="NDVI de -1 a 1"></div><div>-1</div>
+</div>
+<div id="controls">
+  <button id="play">Play</button>
+  <input id="slider" type="range" min="0" value="0">
+  <span id="label"></span>
+</div>
+<script>
+  // Os quadros ficam em arquivos separados e só são baixados quando o slider chega neles
+  const frames = {frames};
+  const img = document.getElementById('frame');
+  const slider = document.getElementById('slider');
+  const label = document.getElementById('label');
+  const play = document.getElementById('play');
+  const cache = {{}};
+  let timer = null;
+
+  function load(i) {{
+    if (i < 0 || i >= frames.length || cache[i]) return;
+    cache[i] = new Image();
+    cache[i].src = frames[i].src;
+  }}
+
+  function show(i) {{
+    img.src = frames[i].src;
+    label.textContent = 'Data: ' + frames[i].label;
+    slider.value = i;
+    load(i + 1);
+  }}
+
+  slider.max = frames.length - 1;
+  slider.addEventListener('input', () => show(Number(slider.value)));
+  play.addEventListener('click', () => {{
+    if (timer) {{ clearInterval(timer); timer = null; play.textContent = 'Play'; return; }}
+    play.textContent = 'Pause';
+    timer = setInterval(() => show((Number(slider.value) + 1) % frames.length), {duration});
+  }});
+  show(0);
+</script>
+</body>
+</html>
+'''
+
+
+def convert_frame(source_path, target_path, image_format='webp', colors=64):
+    """Converte um quadro PNG para WebP ou PNG com paleta reduzida, pulando se já estiver atualizado"""
+    from PIL import Image
+
+    if os.path.exists(target_path) and os.path.getmtime(target_path) >= os.path.getmtime(source_path):
+        return target_path
+
+    with Image.open(source_path) as image:
+        if image_format == 'webp':
+            image.save(target_path, 'WEBP', quality=80, method=6)
+        elif image_format == 'png':
+            quantized = image.convert('RGBA').quantize(colors=colors, method=Image.Quantize.FASTOCTREE)
+            quantized.save(target_path, 'PNG', optimize=True)
+        else:
+            raise ValueError(f'Formato de quadro não suportado: {image_format}')
+
+    return target_path
+
+
+def write_timelapse(images_path, labels, output_dir, image_format='webp', duration=500):
+    """Gera o timelapse com os quadros como arquivos comprimidos separados e carregados sob demanda.
+
+    Grava em output_dir os quadros convertidos (frames/), um manifest frames.json com rótulos e
+    caminhos, e um index.html leve que só referencia os quadros, então o tamanho do HTML não
+    depende do número de quadros nem das imagens.
+    """
+    frames_dir = os.path.join(output_dir, 'frames')
+    os.makedirs(frames_dir, exist_ok=True)
+
+    frames = []
+    for source_path, label in zip(images_path, labels):
+        name = os.path.splitext(os.path.basename(source_path))[0]
+        target_path = os.path.join(frames_dir, f'{name}.{image_format}')
+        convert_frame(source_path, target_path, image_format)
+        frames.append({'label': label, 'src': f'frames/{name}.{image_format}'})
+
+    with open(os.path.join(output_dir, 'frames.json'), 'w', encoding='utf-8') as f:
+        json.dump(frames, f, ensure_ascii=False)
+
+    stops = len(NDVI_PALETTE) - 1
+    gradient = ', '.join(f'#{color} {100 * i / stops:.2f}%' for i, color in enumerate(NDVI_PALETTE))
+
+    html_path = os.path.join(output_dir, 'index.html')
+    with open(html_path, 'w', encoding='utf-8') as f:
+        f.write(TIMELAPSE_TEMPLATE.format(frames=json.dumps(frames, ensure_ascii=False),
+                                          gradient=gradient, duration=duration))
+
+    return html_path
@@ -0,0 +1,194 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+PHENOLOGY_COLUMNS = [
+    'parcel_id', 'peak_ndvi', 'peak_date', 'greenup_date', 'senescence_date', 'season_length_days',
+    'max_drop', 'drop_date', 'harvest_detected',
+]
+
+
+def build_matrix(df, value_column='ndvi_mean', freq_days=5, start_date=None, end_date=None):
+    """Monta a matriz parcelas x datas em intervalos regulares a partir do formato longo do get_all_data.
+
+    Cada observação vai para o intervalo de freq_days que a contém; observações no mesmo intervalo são
+    promediadas e intervalos sem observação ficam com NaN. Sem a coluna parcel_id, o DataFrame é
+    tratado como uma única parcela. Retorna (ids das parcelas, datas da grade, matriz).
+    """
+    dates = pd.to_datetime(df['date']).values.astype('datetime64[D]')
+    parcels = df['parcel_id'].astype(str).values if 'parcel_id' in df.columns else np.zeros(len(df), dtype=int)
+    values = df[value_column].to_numpy(dtype=np.float64)
+
+    start = np.datetime64(start_date, 'D') if start_date is not None else dates.min()
+    end = np.datetime64(end_date, 'D') if end_date is not None else dates.max() + 1
+    grid = np.arange(start, end, np.timedelta64(freq_days, 'D'))
+
+    valid = np.isfinite(values) & (dates >= start) & (dates < end)
+    rows, parcel_ids = pd.factorize(parcels, sort=True)
+    cols = ((dates - start).astype(np.int64) // freq_days)
+
+    sums = np.zeros((len(parcel_ids), len(grid)))
+    counts = np.zeros((len(parcel_ids), len(grid)))
+    np.add.at(sums, (rows[valid], cols[valid]), values[valid])
+    np.add.at(counts, (rows[valid], cols[valid]), 1)
+
+    with np.errstate(invalid='ignore'):
+        matrix = sums / counts
+
+    return parcel_ids, grid, matrix
+
+
+def fill_gaps(matrix):
+    """Interpolação linear das lacunas (NaN) de todas as linhas de uma vez; as pontas repetem o valor
+    válido mais próximo e linhas sem nenhum valor continuam NaN"""
+    n_cols = matrix.shape[1]
+    valid = np.isfinite(matrix)
+    index = np.broadcast_to(np.arange(n_cols), matrix.shape)
+
+    previous = np.maximum.accumulate(np.where(valid, index, -1), axis=1)
+    following = np.minimum.accumulate(np.where(valid, index, n_cols)[:, ::-1], axis=1)[:, ::-1]
+
+    has_previous = previous >= 0
+    has_following = following < n_cols
+    previous = np.where(has_previous, previous, following)
+    following = np.where(has_following, following, previous)
+
+    rows = np.arange(matrix.shape[0])[:, None]
+    empty = ~valid.any(axis=1)
+    previous[empty] = 0
+    following[empty] = 0
+
+    v_previous = matrix[rows, previous]
+    v_following = matrix[rows, following]
+    span = following - previous
+    with np.errstate(invalid='ignore', divide='ignore'):
+        weight = np.where(span > 0, (index - previous) / span, 0.0)
+
+    filled = v_previous + (v_following - v_previous) * weight
+    filled[empty] = np.nan
+    return filled
+
+
+def observation_steps(matrix):
+    """Variação de cada observação em relação à observação válida anterior da mesma linha, sem interpolar
+    as lacunas (que espalhariam uma queda brusca pelas datas sem cena). Retorna (variações, posição da
+    observação anterior); a variação é NaN onde não há observação ou não há nenhuma antes"""
+    n_cols = matrix.shape[1]
+    valid = np.isfinite(matrix)
+    index = np.broadcast_to(np.arange(n_cols), matrix.shape)
+
+    last = np.maximum.accumulate(np.where(valid, index, -1), axis=1)
+    previous = np.empty_like(last)
+    previous[:, 0] = -1
+    previous[:, 1:] = last[:, :-1]
+
+    rows = np.arange(matrix.shape[0])[:, None]
+    steps = matrix - matrix[rows, np.maximum(previous, 0)]
+    return np.where(valid & (previous >= 0), steps, np.nan), previous
+
+
+def savgol_coefficients(window, polyorder):
+    """Coeficientes do filtro de Savitzky-Golay (suavização, derivada zero) para uma janela ímpar"""
+    if window % 2 == 0 or window <= polyorder:
+        raise ValueError('A janela deve ser ímpar e maior que a ordem do polinômio')
+
+    half = window // 2
+    x = np.arange(-half, half + 1)
+    vandermonde = np.vander(x, polyorder + 1, increasing=True)
+    return np.linalg.pinv(vandermonde)[0]
+
+
+def savgol_smooth(matrix, window=7, polyorder=2):
+    """Suavização de Savitzky-Golay aplicada a todas as linhas de uma vez (bordas espelhadas)"""
+    half = window // 2
+    if matrix.shape[1] <= half:
+        return matrix.copy()
+
+    coefficients = savgol_coefficients(window, polyorder)
+    padded = np.pad(matrix, ((0, 0), (half, half)), mode='reflect')
+    return sliding_window_view(padded, window, axis=1) @ coefficients
+
+
+def phenology_metrics(matrix, dates, parcel_ids, threshold=0.5, drop_threshold=0.2, raw=None, drop_rate=0.02):
+    """Métricas fenológicas de cada linha de uma matriz já preenchida e suavizada.
+
+    - pico: maior NDVI e sua data;
+    - green-up: primeira data antes do pico em que o NDVI passa de base + threshold * amplitude, sendo
+      base o mínimo antes do pico;
+    - senescência: primeira data depois do pico em que o NDVI volta abaixo desse mesmo limiar;
+    - duração da safra: dias entre green-up e senescência;
+    - queda: maior redução entre duas observações consecutivas de raw (a matriz antes do preenchimento
+      e da suavização, que espalham uma queda brusca por várias datas; por padrão a própria matrix), entre
+      as que caem pelo menos drop_rate por dia (uma senescência gradual vista através de uma lacuna longa
+      não conta); abaixo de -drop_threshold é marcada como colheita (ou corte/pastejo intenso). Séries sem
+      nenhuma queda assim não têm queda (NaN/NaT).
+    """
+    n_rows, n_cols = matrix.shape
+    rows = np.arange(n_rows)
+    index = np.arange(n_cols)
+    empty = ~np.isfinite(matrix).any(axis=1)
+    values = np.where(np.isfinite(matrix), matrix, -np.inf)
+
+    peak = values.argmax(axis=1)
+    peak_value = values[rows, peak]
+
+    before_peak = index[None, :] <= peak[:, None]
+    base = np.where(before_peak, np.where(np.isfinite(matrix), matrix, np.inf), np.inf).min(axis=1)
+    level = base + threshold * (peak_value - base)
+
+    above = np.isfinite(matrix) & (matrix >= level[:, None])
+    greenup = np.where(before_peak & above, index, n_cols).min(axis=1)
+
+    after_peak = index[None, :] > peak[:, None]
+    below = np.isfinite(matrix) & (matrix < level[:, None])
+    senescence = np.where(after_peak & below, index, n_cols).min(axis=1)
+
+    steps, previous = observation_steps(matrix if raw is None else raw)
+    days = (dates - dates[np.maximum(previous, 0)]).astype('timedelta64[D]').astype(np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        abrupt = np.isfinite(steps) & (steps <= -drop_rate * days)
+    steps = np.where(abrupt, steps, np.inf)
+    drop_index = steps.argmin(axis=1)
+    max_drop = steps.min(axis=1)
+
+    def to_dates(positions):
+        return np.where(positions < n_cols, dates[np.minimum(positions, n_cols - 1)], np.datetime64('NaT'))
+
+    greenup_date = to_dates(greenup)
+    senescence_date = to_dates(senescence)
+    # Sem nenhum passo negativo não há queda
+    max_drop = np.where(np.isfinite(max_drop) & (max_drop < 0), max_drop, np.nan)
+    season_length = np.where(np.isnat(greenup_date) | np.isnat(senescence_date), np.nan,
+                             (senescence_date - greenup_date).astype('timedelta64[D]').astype(np.float64))
+
+    result = pd.DataFrame({
+        'parcel_id': parcel_ids,
+        'peak_ndvi': np.where(empty, np.nan, peak_value),
+        'peak_date': np.where(empty, np.datetime64('NaT'), dates[peak]),
+        'greenup_date': greenup_date,
+        'senescence_date': senescence_date,
+        'season_length_days': season_length,
+        'max_drop': max_drop,
+        'drop_date': np.where(np.isnan(max_drop), np.datetime64('NaT'), dates[np.minimum(drop_index, n_cols - 1)]),
+        'harvest_detected': max_drop <= -drop_threshold,
+    }, columns=PHENOLOGY_COLUMNS)
+
+    return result
+
+
+def compute_phenology(df, value_column='ndvi_mean', freq_days=5, window=7, polyorder=2, threshold=0.5,
+                      drop_threshold=0.2, drop_rate=0.02):
+    """Preenche lacunas, suaviza e extrai as métricas fenológicas de todas as parcelas de um DataFrame
+    longo (parcel_id, date, ndvi_*). Retorna (métricas por parcela, série suavizada no formato longo)."""
+    parcel_ids, dates, matrix = build_matrix(df, value_column, freq_days)
+    smoothed = savgol_smooth(fill_gaps(matrix), window, polyorder)
+    metrics = phenology_metrics(smoothed, dates, parcel_ids, threshold, drop_threshold, raw=matrix,
+                                drop_rate=drop_rate)
+
+    series = pd.DataFrame({
+        'parcel_id': np.repeat(parcel_ids, len(dates)),
+        'date': np.tile(dates, len(parcel_ids)),
+        f'{value_column}_smooth': smoothed.ravel(),
+    })
+
+    return metrics, series
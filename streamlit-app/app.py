@@ -2,15 +2,69 @@ import streamlit as st
 from streamlit_option_menu import option_menu
 import sys
 import os
+import json
+import matplotlib.pyplot as plt
+import pandas as pd
 import streamlit.components.v1 as components
-from PIL import Image
 
 sys.path.insert(0, os.getcwd())
 
+from src.data_visualization import NDVIVisualization
+from src.storage import NDVIStore
+
+STORE_PATH = 'data/processed/ndvi_store'
+CSV_PATH = 'data/processed/ndvi.csv'
+MAP_PATH = 'data/results/map.html'
+TIMELAPSE_PATH = 'data/results/images_slider.html'
+TIMELAPSE_DIR = 'data/results/timelapse'
+
 st.set_page_config(
     page_title="Agro Analysis",
     layout="wide")
 
+
+def get_mtime(path):
+    """Data de modificação do arquivo (ou do arquivo mais recente de um diretório), usada como chave de cache"""
+    if os.path.isdir(path):
+        return max((os.path.getmtime(os.path.join(root, name))
+                    for root, _, files in os.walk(path) for name in files), default=0)
+    return os.path.getmtime(path) if os.path.exists(path) else 0
+
+
+@st.cache_data
+def load_ndvi_data(path, mtime):
+    """Carrega os dados de NDVI uma única vez; o mtime na chave faz o cache expirar quando o arquivo muda"""
+    if os.path.isdir(path):
+        return NDVIStore(path).read()
+
+    df = pd.read_csv(path, parse_dates=['date'])
+    df.insert(0, 'parcel_id', os.path.splitext(os.path.basename(path))[0])
+    return df
+
+
+@st.cache_data
+def select_slice(df, parcel_id, start_date, end_date):
+    """Recorte da propriedade e do período escolhidos"""
+    mask = ((df['parcel_id'] == parcel_id)
+            & (df['date'] >= pd.Timestamp(start_date))
+            & (df['date'] <= pd.Timestamp(end_date)))
+    return df[mask].drop(columns='parcel_id').reset_index(drop=True)
+
+
+@st.cache_data
+def load_timelapse_frames(path, mtime):
+    """Manifest dos quadros do timelapse gerado por plot_images_timelapse_assets"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@st.cache_data
+def read_text(path, mtime):
+    """Lê um HTML pré-gerado uma única vez por versão do arquivo"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
 st.markdown("""
 <style>
 .big-font {
@@ -36,47 +90,71 @@ if selected=="Visualizações":
     st.markdown(" Produção de Cana-de-Açúcar e Criação de Gado")
     st.divider()
 
-    st.subheader('Visão Geral da Propriedade')
-    with open("data/results/map.html", "r") as f:
-        html_str = f.read()
+    data_path = STORE_PATH if os.path.isdir(STORE_PATH) else CSV_PATH
+    df_ndvi = load_ndvi_data(data_path, get_mtime(data_path))
+
+    with st.container():
+        col1, col2 = st.columns(2)
+        parcel_id = col1.selectbox('Propriedade', sorted(df_ndvi['parcel_id'].unique()))
+
+        df_parcel = df_ndvi[df_ndvi['parcel_id'] == parcel_id]
+        min_date = df_parcel['date'].min().date()
+        max_date = df_parcel['date'].max().date()
+        start_date, end_date = min_date, max_date
+        if min_date < max_date:
+            start_date, end_date = col2.slider('Período', min_value=min_date, max_value=max_date,
+                                               value=(min_date, max_date), format='DD/MM/YYYY')
 
-    components.html(html_str, height=600)
+    df_slice = select_slice(df_ndvi, parcel_id, start_date, end_date)
+    visualization = NDVIVisualization(df_data=df_slice, start_date=start_date.strftime('%Y-%m-%d'), feature=None)
 
     st.divider()
 
-    st.subheader('Dados Temporais de NDVI')
-    image = Image.open("data/results/temporal_ndvi_mean.png")
-    st.image(image, caption='Tendência da Média de NDVI na Propriedade', use_column_width=True)
+    # As seções só são montadas quando abertas, evitando gerar figuras que não serão vistas
+    if st.toggle('Visão Geral da Propriedade', value=True):
+        st.subheader('Visão Geral da Propriedade')
+        components.html(read_text(MAP_PATH, get_mtime(MAP_PATH)), height=600)
 
     st.divider()
 
-    st.subheader('Gráfico de Linha NDVI')
-    with open("data/results/iterative_ndvi.html", "r", encoding="utf-8") as f:
-        html_str = f.read()
-    components.html(html_str, height=400)
+    if st.toggle('Dados Temporais de NDVI'):
+        st.subheader('Dados Temporais de NDVI')
+        fig = visualization.build_timeseries_figure()
+        st.pyplot(fig)
+        # O st.pyplot não fecha uma figura passada explicitamente; sem isso o servidor acumula uma por rerun
+        plt.close(fig)
+        st.caption('Tendência da Média de NDVI na Propriedade')
 
     st.divider()
 
-    st.subheader('Timelapse NDVI')
-    with open("data/results/images_slider.html", "r", encoding="utf-8") as f:
-        html_str = f.read()
-    components.html(html_str, height=500)
+    if st.toggle('Gráfico de Linha NDVI'):
+        st.subheader('Gráfico de Linha NDVI')
+        st.plotly_chart(visualization.build_ndvi_figure(), use_container_width=True)
 
     st.divider()
 
-    with st.container():
-        col1,col2=st.columns(2)
-        with col1:
-            st.subheader('Histograma NDVI')
-            with open("data/results/iterative_histogram.html", "r", encoding="utf-8") as f:
-                html_str = f.read()
-
-            components.html(html_str, height=400)
-        with col2:
-            st.subheader('BoxPlot NDVI por Ano')
-            with open("data/results/iterative_boxplot.html", "r", encoding="utf-8") as f:
-                html_str = f.read()
-            components.html(html_str, height=400)
+    if st.toggle('Timelapse NDVI'):
+        st.subheader('Timelapse NDVI')
+        manifest_path = os.path.join(TIMELAPSE_DIR, 'frames.json')
+        if os.path.exists(manifest_path):
+            # Apenas o quadro selecionado é carregado a cada interação
+            frames = load_timelapse_frames(manifest_path, get_mtime(manifest_path))
+            frame = st.select_slider('Data', options=frames, format_func=lambda f: f['label'])
+            st.image(os.path.join(TIMELAPSE_DIR, frame['src']), caption=frame['label'])
+        else:
+            components.html(read_text(TIMELAPSE_PATH, get_mtime(TIMELAPSE_PATH)), height=500)
+
+    st.divider()
+
+    if st.toggle('Distribuição do NDVI'):
+        with st.container():
+            col1,col2=st.columns(2)
+            with col1:
+                st.subheader('Histograma NDVI')
+                st.plotly_chart(visualization.build_histogram_figure(), use_container_width=True)
+            with col2:
+                st.subheader('BoxPlot NDVI por Ano')
+                st.plotly_chart(visualization.build_boxplot_figure(), use_container_width=True)
 
 if selected=='Sobre':
     st.title('Dados')